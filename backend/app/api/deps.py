@@ -0,0 +1,30 @@
+import os
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request
+
+from app.clients.registry import ClientRegistry, KNOWLEDGE_COLLECTION, get_registry
+from app.clients.vector_client import VectorStore
+
+# ==============================
+# CONFIG
+# ==============================
+# Shared secret for /admin routes, sent as X-Admin-Token; admin routes are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def get_clients(request: Request) -> ClientRegistry:
+    clients = getattr(request.app.state, "clients", None)
+    return clients or get_registry()
+
+
+def get_knowledge_store(request: Request) -> VectorStore:
+    return get_clients(request).vector_store(KNOWLEDGE_COLLECTION)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled (ADMIN_TOKEN not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -1,7 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from app.db.session import SessionLocal
 from app.models.user import User
-from app.clients.vector_client import VectorStore
+from app.api.deps import get_clients
+from app.clients.registry import ClientRegistry, KNOWLEDGE_COLLECTION
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -12,16 +13,16 @@ def list_users():
     return users
 
 @router.delete("/vectors/reset")
-def reset_vectors():
-    vs = VectorStore("enterprise_docs")
-    vs.client.delete_collection("enterprise_docs")
+def reset_vectors(clients: ClientRegistry = Depends(get_clients)):
+    clients.drop_collection("enterprise_docs")
     return {"status": "Vector DB cleared"}
 
 @router.get("/stats")
-def system_stats():
-    vs = VectorStore("enterprise_docs")
-    collections = vs.client.get_collections()
+def system_stats(clients: ClientRegistry = Depends(get_clients)):
+    # Through the registry, so it works with either vector backend
     return {
-        "collections": collections,
+        "backend": "local" if clients.local else "qdrant",
+        "collections": clients.collection_names(),
+        "points": clients.vector_store(KNOWLEDGE_COLLECTION).count(),
         "status": "system healthy"
     }
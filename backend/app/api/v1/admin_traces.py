@@ -0,0 +1,31 @@
+import os
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.core.tracing import (
+    TRACE_PROFILE_SAMPLE_RATE,
+    TRACE_PROFILE_THRESHOLD_MS,
+    get_profile_store,
+)
+
+router = APIRouter(prefix="/admin/profiles", tags=["Admin Profiles"])
+
+
+@router.get("")
+def list_profiles():
+    """Kept request profiles, newest first, with their span breakdowns."""
+    return {
+        "sample_rate": TRACE_PROFILE_SAMPLE_RATE,
+        "threshold_ms": TRACE_PROFILE_THRESHOLD_MS,
+        "profiles": get_profile_store().list(),
+    }
+
+
+@router.get("/{profile_id}")
+def download_profile(profile_id: str):
+    """Folded stacks ("frame;frame;frame count" per line) for flamegraph.pl or speedscope."""
+    path = get_profile_store().path(profile_id, "folded")
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
@@ -1,17 +1,40 @@
-from fastapi import APIRouter
-from app.clients.vector_client import VectorStore
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import get_clients
+from app.clients.collection_profile import COLLECTION_PROFILE, PROFILES, get_profile
+from app.clients.registry import ClientRegistry
 
 router = APIRouter(prefix="/admin/vectors", tags=["Admin Vectors"])
 
+
+class MigrateRequest(BaseModel):
+    profile: str
+
+
+def _require_qdrant(clients: ClientRegistry):
+    if clients.local:
+        raise HTTPException(status_code=400, detail="Collection profiles apply to the Qdrant backend only")
+
+
+async def _existing_store(clients: ClientRegistry, collection_name: str):
+    # vector_store() creates missing collections; an admin typo must not
+    if not await run_in_threadpool(clients.qdrant.collection_exists, collection_name):
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+    return clients.vector_store(collection_name)
+
+
 @router.get("/collections")
-def list_collections():
-    vs = VectorStore(collection_name="enterprise_docs")
-    return vs.client.get_collections()
+def list_collections(clients: ClientRegistry = Depends(get_clients)):
+    _require_qdrant(clients)
+    return clients.qdrant.get_collections()
+
 
 @router.get("/points")
-def list_vectors(limit: int = 5):
-    vs = VectorStore(collection_name="enterprise_docs")
-    points, _ = vs.client.scroll(
+def list_vectors(limit: int = 5, clients: ClientRegistry = Depends(get_clients)):
+    _require_qdrant(clients)
+    points, _ = clients.qdrant.scroll(
         collection_name="enterprise_docs",
         limit=limit
     )
@@ -19,3 +42,49 @@ def list_vectors(limit: int = 5):
         "count": len(points),
         "points": points
     }
+
+
+@router.get("/profiles")
+def list_profiles():
+    return {
+        "active": COLLECTION_PROFILE,
+        "profiles": {name: profile._asdict() for name, profile in PROFILES.items()},
+    }
+
+
+@router.get("/collections/{collection_name}/profile")
+async def collection_profile(collection_name: str, clients: ClientRegistry = Depends(get_clients)):
+    _require_qdrant(clients)
+    store = await _existing_store(clients, collection_name)
+    return {
+        "collection": collection_name,
+        "search_profile": store.profile._asdict(),
+        "storage": await run_in_threadpool(store.describe),
+    }
+
+
+@router.post("/collections/{collection_name}/migrate")
+async def migrate_collection(
+    collection_name: str,
+    req: MigrateRequest,
+    clients: ClientRegistry = Depends(get_clients),
+):
+    """
+    Apply a profile to an existing collection in place. The collection keeps
+    serving while it is re-optimized; poll the profile endpoint until status is
+    "green". Only this process picks up the new search parameters, so set
+    COLLECTION_PROFILE to match before the next deploy.
+    """
+    _require_qdrant(clients)
+    try:
+        profile = get_profile(req.profile)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+    store = await _existing_store(clients, collection_name)
+    try:
+        storage = await run_in_threadpool(store.apply_profile, profile)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"collection": collection_name, "profile": req.profile, "storage": storage}
@@ -1,17 +1,92 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, model_validator
+from typing import List, Literal, NamedTuple, Optional
+import json
 import logging
-from fastapi.concurrency import run_in_threadpool
+import os
+
+import numpy as np
 
 # 🔥 ADD THESE IMPORTS (REQUIRED)
-from qdrant_client.models import Filter, FieldCondition, MatchValue
+from qdrant_client.models import Filter, FieldCondition, MatchAny, MatchValue
+
+from app.api.deps import get_clients
+from app.clients.registry import ClientRegistry, KNOWLEDGE_COLLECTION
+from app.clients.rerank_client import RERANK_CANDIDATES, get_rerank_client
+from app.core.metrics import PROMPT_TOKENS, stage_timer
+from app.core.tokens import count_tokens
+from app.services.context_service import pack_context
+from app.services.lexical_index_service import LexicalScope
+from app.services.retrieval_service import hybrid_search
+from app.services.semantic_cache_service import ALL_DOCUMENTS, get_semantic_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Retrieved chunks per search scope; wider scopes need more candidates to cover more documents.
+# Context packing still caps what reaches the prompt.
+CHAT_LIMIT_DOCUMENT = int(os.getenv("CHAT_LIMIT_DOCUMENT", "10"))
+CHAT_LIMIT_DOCUMENTS = int(os.getenv("CHAT_LIMIT_DOCUMENTS", "15"))
+CHAT_LIMIT_COLLECTION = int(os.getenv("CHAT_LIMIT_COLLECTION", "20"))
+CHAT_MAX_DOCUMENT_IDS = 500
+
+
 class ChatRequest(BaseModel):
+    """
+    Search scope: one `document_id`, a list of `document_ids`, `tags` (any of),
+    a `tenant_id`, or `scope="all"` for the whole collection. Tag and tenant
+    filters combine with each other and with document ids.
+    """
     query: str
-    document_id: str
+    document_id: Optional[str] = None
+    document_ids: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    tenant_id: Optional[str] = None
+    scope: Optional[Literal["all"]] = None
+
+    @model_validator(mode="after")
+    def _check_scope(self):
+        if not (self.document_id or self.document_ids or self.tags or self.tenant_id or self.scope):
+            raise ValueError("Provide document_id, document_ids, tags, tenant_id or scope='all'")
+        if self.document_ids and len(self.document_ids) > CHAT_MAX_DOCUMENT_IDS:
+            raise ValueError(f"At most {CHAT_MAX_DOCUMENT_IDS} document_ids per query")
+        return self
+
+
+class SearchScope(NamedTuple):
+    cache_key: str
+    query_filter: Optional[Filter]
+    lexical_scope: LexicalScope         # the same scope, for the BM25 index
+    limit: int
+
+
+def resolve_scope(req: ChatRequest) -> SearchScope:
+    document_ids = sorted(set(req.document_ids or []) | ({req.document_id} if req.document_id else set()))
+
+    conditions = []
+    if len(document_ids) == 1:
+        conditions.append(FieldCondition(key="document_id", match=MatchValue(value=document_ids[0])))
+    elif document_ids:
+        conditions.append(FieldCondition(key="document_id", match=MatchAny(any=document_ids)))
+    if req.tags:
+        conditions.append(FieldCondition(key="tags", match=MatchAny(any=sorted(set(req.tags)))))
+    if req.tenant_id:
+        conditions.append(FieldCondition(key="tenant_id", match=MatchValue(value=req.tenant_id)))
+
+    # 🔥 BUILD PROPER QDRANT FILTER (THIS IS THE FIX)
+    query_filter = Filter(must=conditions) if conditions else None
+    lexical_scope = LexicalScope(document_ids or None, req.tenant_id, req.tags)
+
+    if len(document_ids) == 1 and not (req.tags or req.tenant_id):
+        return SearchScope(document_ids[0], query_filter, lexical_scope, CHAT_LIMIT_DOCUMENT)
+
+    # Multi-document scopes share the ALL_DOCUMENTS prefix so any re-index invalidates them
+    cache_key = ALL_DOCUMENTS + json.dumps(
+        [document_ids, sorted(set(req.tags or [])), req.tenant_id], separators=(",", ":")
+    )
+    limit = CHAT_LIMIT_DOCUMENTS if document_ids else CHAT_LIMIT_COLLECTION
+    return SearchScope(cache_key, query_filter, lexical_scope, limit)
 
 
 @router.get("/test")
@@ -19,70 +94,89 @@ async def chat_test():
     return {"status": "chat router loaded"}
 
 
-@router.post("/")
-async def chat(req: ChatRequest):
-    try:
-        from app.clients.embed_client import EmbedClient
-        from app.clients.vector_client import VectorStore
-        from app.clients.llm_client import LLMClient
-
-        if not req.query or not req.query.strip():
-            return {"answer": "Please enter a valid question."}
-
-        # 1️⃣ Embed the question
-        embed_client = EmbedClient()
-        embeddings = await run_in_threadpool(
-            embed_client.embed,
-            [req.query.strip()]
-        )
-        query_embedding = embeddings[0]
-
-        # 🔥 BUILD PROPER QDRANT FILTER (THIS IS THE FIX)
-        document_filter = Filter(
-            must=[
-                FieldCondition(
-                    key="document_id",
-                    match=MatchValue(value=req.document_id)
-                )
-            ]
-        )
+class PreparedAnswer(NamedTuple):
+    prompt: Optional[str]
+    sources: List[dict]
+    # Set when the answer is known without calling the LLM
+    answer: Optional[str] = None
+    query_embedding: Optional[np.ndarray] = None
+    prompt_tokens: int = 0
 
-        # 2️⃣ Vector search (FILTERED)
-        vector_store = VectorStore(collection_name="enterprise_knowledge")
-        results = await run_in_threadpool(
-            vector_store.search,
-            query_embedding,
-            10,
-            document_filter
-        )
 
-        logger.info(
-            f"Retrieved {len(results)} chunks "
-            f"for query='{req.query}' "
-            f"document_id='{req.document_id}'"
+def cache_answer(req: ChatRequest, prepared: PreparedAnswer, answer: str):
+    cache = get_semantic_cache()
+    if cache is not None and answer:
+        cache.store(
+            resolve_scope(req).cache_key,
+            prepared.query_embedding,
+            {"answer": answer, "sources": prepared.sources},
         )
 
-        if not results:
-            return {
-                "answer": "I couldn't find any relevant information in the uploaded document."
-            }
 
-        # 3️⃣ Build context (unchanged)
-        context_parts = []
-        for hit in results:
-            if isinstance(hit.payload, dict):
-                text = hit.payload.get("text", "").strip()
-                if text:
-                    context_parts.append(text)
+async def prepare_answer(req: ChatRequest, clients: ClientRegistry) -> PreparedAnswer:
+    """Embed the question, retrieve context and build the LLM prompt."""
+    from app.clients.embed_client import get_embed_batcher
 
-        context = "\n\n".join(context_parts)
+    if not req.query or not req.query.strip():
+        return PreparedAnswer(None, [], "Please enter a valid question.")
 
-        if not context.strip():
-            return {
-                "answer": "I don't have enough information in the document."
-            }
+    scope = resolve_scope(req)
 
-        prompt = f"""You are a helpful assistant. Answer the question using ONLY the following context from uploaded documents.
+    # 1️⃣ Embed the question (batched with concurrent requests)
+    with stage_timer("query_embed"):
+        query_embedding = await get_embed_batcher().embed(req.query.strip())
+
+    # Paraphrases of a recently answered question reuse its answer
+    cache = get_semantic_cache()
+    with stage_timer("cache_lookup"):
+        cached = cache.lookup(scope.cache_key, query_embedding) if cache else None
+    if cached is not None:
+        return PreparedAnswer(None, cached["sources"], cached["answer"], query_embedding)
+
+    # 2️⃣ Hybrid search: dense (FILTERED, async) fused with BM25 for exact codes and names
+    # With a reranker, retrieve a wider candidate set and keep only its top-k
+    reranker = get_rerank_client()
+    vector_store = clients.vector_store(KNOWLEDGE_COLLECTION)
+    results = await hybrid_search(
+        vector_store,
+        req.query,
+        query_embedding,
+        max(RERANK_CANDIDATES, scope.limit) if reranker else scope.limit,
+        scope.query_filter,
+        lexical_scope=scope.lexical_scope,
+    )
+    if reranker is not None and results:
+        results = await reranker.arerank(req.query, results)
+
+    logger.info(
+        f"Retrieved {len(results)} chunks "
+        f"for query='{req.query}' "
+        f"scope='{scope.cache_key}'"
+    )
+
+    if not results:
+        return PreparedAnswer(
+            None, [], "I couldn't find any relevant information in the uploaded document."
+        )
+
+    # 3️⃣ Build context: best chunks first, near-duplicates dropped, capped at the token budget
+    with stage_timer("prompt_build"):
+        packed = pack_context(results)
+    sources = [
+        {
+            "document_id": hit.payload.get("document_id"),
+            "filename": hit.payload.get("filename"),
+            "chunk_index": hit.payload.get("chunk_index"),
+            "score": hit.score,
+        }
+        for hit in packed.hits
+    ]
+    context = packed.text
+
+    if not context.strip():
+        return PreparedAnswer(None, [], "I don't have enough information in the document.")
+
+    prompt = f"""You are a helpful assistant. Answer the question using ONLY the following context from uploaded documents.
 If the context does not contain enough information, say "I don't have enough information."
 
 Context:
@@ -92,17 +186,80 @@ Question: {req.query}
 
 Answer:"""
 
-        # 4️⃣ LLM call (unchanged)
-        llm_client = LLMClient()
-        answer = await run_in_threadpool(
-            llm_client.generate,
-            prompt
-        )
+    prompt_tokens = count_tokens(prompt)
+    PROMPT_TOKENS.observe(prompt_tokens)
+    return PreparedAnswer(prompt, sources, None, query_embedding, prompt_tokens)
+
 
-        return {"answer": answer.strip() or "No answer generated."}
+@router.post("/")
+async def chat(req: ChatRequest, clients: ClientRegistry = Depends(get_clients)):
+    try:
+        prepared = await prepare_answer(req, clients)
+        if prepared.answer is not None:
+            return {"answer": prepared.answer}
+
+        # 4️⃣ LLM call (async, on the event loop)
+        llm_client = clients.llm_client()
+        answer = await llm_client.agenerate(prepared.prompt)
+        cache_answer(req, prepared, answer.strip())
+
+        return {
+            "answer": answer.strip() or "No answer generated.",
+            "prompt_tokens": prepared.prompt_tokens,
+        }
 
     except Exception as e:
         logger.exception("Chat endpoint error")
         return {
             "answer": f"Error processing query: {str(e)}"
         }
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream(req: ChatRequest, clients: ClientRegistry = Depends(get_clients)):
+    """
+    Server-sent events: one `sources` event as soon as retrieval finishes,
+    then `token` events as Groq produces them, then `done` (or `error`).
+    """
+    async def events():
+        try:
+            prepared = await prepare_answer(req, clients)
+            yield _sse("sources", {"sources": prepared.sources, "prompt_tokens": prepared.prompt_tokens})
+
+            if prepared.answer is not None:
+                yield _sse("token", {"text": prepared.answer})
+            else:
+                llm_client = clients.llm_client()
+                tokens = []
+                async for token in llm_client.agenerate_stream(prepared.prompt):
+                    tokens.append(token)
+                    yield _sse("token", {"text": token})
+                cache_answer(req, prepared, "".join(tokens).strip())
+
+            yield _sse("done", {})
+
+        except Exception as e:
+            logger.exception("Chat stream error")
+            yield _sse("error", {"message": f"Error processing query: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",   # Don't let proxies hold tokens back
+        },
+    )
+
+
+@router.get("/cache/stats")
+async def chat_cache_stats():
+    cache = get_semantic_cache()
+    reranker = get_rerank_client()
+    stats = cache.stats() if cache else {"enabled": False}
+    stats["reranker"] = reranker.stats() if reranker else {"enabled": False}
+    return stats
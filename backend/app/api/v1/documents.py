@@ -1,18 +1,22 @@
-from fastapi import APIRouter, UploadFile, Depends, HTTPException, File, BackgroundTasks
+from fastapi import APIRouter, UploadFile, Depends, HTTPException, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-import tempfile
+from typing import List, Optional
 import os
 import logging
 import uuid
 
 from app.db.session import SessionLocal
-from app.clients.vector_client import VectorStore
-from app.clients.embed_client import EmbedClient  # Same embedder as chat
-
-import PyPDF2
-from docx import Document
-from bs4 import BeautifulSoup
+from app.api.deps import get_knowledge_store
+from app.clients.registry import KNOWLEDGE_COLLECTION
+from app.core.metrics import stage_timer
+from app.services import job_service
+from app.services.chunk_service import chunk_text
+from app.services.extract_service import (
+    UploadTooLargeError,
+    spool_upload,
+)
 
 # ==============================
 # ROUTER
@@ -22,7 +26,7 @@ router = APIRouter(tags=["documents"])
 # ==============================
 # VECTOR STORE
 # ==============================
-vector_store = VectorStore(collection_name="enterprise_knowledge")
+COLLECTION_NAME = KNOWLEDGE_COLLECTION
 
 # ==============================
 # CONFIG
@@ -48,41 +52,6 @@ def get_db():
     finally:
         db.close()
 
-# ==============================
-# TEXT EXTRACTION
-# ==============================
-def extract_text_safe(file_path: str, filename: str) -> str:
-    ext = os.path.splitext(filename)[1].lower()
-
-    try:
-        if ext == ".pdf":
-            with open(file_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                return "\n".join(page.extract_text() or "" for page in reader.pages).strip()
-
-        elif ext in [".txt", ".md", ".csv"]:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                return f.read().strip()
-
-        elif ext == ".docx":
-            doc = Document(file_path)
-            return "\n".join(p.text for p in doc.paragraphs if p.text.strip()).strip()
-
-        elif ext in [".html", ".htm"]:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                soup = BeautifulSoup(f.read(), "html.parser")
-                return soup.get_text(separator="\n").strip()
-
-        elif ext in [".jpg", ".jpeg", ".png", ".tiff"]:
-            return f"[Image file: {filename}]"
-
-        else:
-            return ""
-
-    except Exception as e:
-        logger.error(f"Text extraction failed: {e}")
-        return ""
-
 # ==============================
 # OPTIONS (CORS PREFLIGHT)
 # ==============================
@@ -102,31 +71,12 @@ async def options_upload():
 # SMART CHUNKING
 # ==============================
 def smart_chunk_text(text: str) -> list[str]:
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    chunks = []
-    current = ""
-
-    for line in lines:
-        if len(current) + len(line) <= 300:
-            current += line + "\n"
-        else:
-            chunks.append(current.strip())
-            current = line + "\n"
-
-    if current.strip():
-        chunks.append(current.strip())
-
-    return list(dict.fromkeys(chunks))
+    return chunk_text(text)
 
 # ==============================
 # UPLOAD ENDPOINT
 # ==============================
-@router.post("/upload")
-async def upload_document(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-):
+async def _spool_validated_upload(file: UploadFile) -> str:
     if not file.filename:
         raise HTTPException(status_code=400, detail="No filename provided")
 
@@ -134,56 +84,123 @@ async def upload_document(
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
 
-    content = await file.read()
-    if len(content) > 50 * 1024 * 1024:
+    # Spool to disk block by block instead of reading the whole upload into memory
+    try:
+        with stage_timer("upload_read"):
+            return await spool_upload(file, suffix=ext)
+    except UploadTooLargeError:
         raise HTTPException(status_code=400, detail="File too large")
 
-    tmp_path = None
 
+def _parse_tags(tags: Optional[str]) -> List[str]:
+    # Comma-separated form field, e.g. "finance,policies"
+    if not tags:
+        return []
+    return sorted({t.strip() for t in tags.split(",") if t.strip()})
+
+
+async def _enqueue(
+    tmp_path: str,
+    filename: str,
+    document_id: str,
+    kind: str,
+    tags: List[str],
+    tenant_id: Optional[str],
+):
+    # Extraction, embedding and indexing run on the ingest worker; the spooled file is its input
     try:
-        # ✅ Generate document_id PER UPLOAD (FIX)
-        document_id = str(uuid.uuid4())
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext, dir="/tmp") as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
-
-        text = extract_text_safe(tmp_path, file.filename)
-        if not text or len(text) < 10:
-            raise HTTPException(status_code=400, detail="No meaningful text extracted from the document")
-
-        chunks = smart_chunk_text(text)
-
-        logger.info(f"Indexing {len(chunks)} chunks")
-
-        embed_client = EmbedClient()
-        embeddings = embed_client.embed(chunks)
-
-        payloads = [
-            {
-                "text": chunk,
-                "filename": file.filename,
-                "document_id": document_id,   # ✅ ADD ONLY THIS FIELD
-                "chunk_index": i,
-            }
-            for i, chunk in enumerate(chunks)
-        ]
-
-        vector_store.add_embeddings(embeddings, payloads)
-
-        return JSONResponse(
-            status_code=200,
-            content={
-                "message": "Document uploaded and indexed successfully",
-                "filename": file.filename,
-                "document_id": document_id,   # ✅ RETURN IT
-                "chunks_stored": len(chunks),
-            },
+        return await run_in_threadpool(
+            job_service.enqueue_ingest,
+            tmp_path,
+            filename,
+            document_id,
+            COLLECTION_NAME,
+            kind,
+            tags,
+            tenant_id,
         )
+    except Exception:
+        os.unlink(tmp_path)
+        raise
 
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+
+@router.post("/upload")
+async def upload_document(
+    file: UploadFile = File(...),
+    tags: Optional[str] = Form(None),
+    tenant_id: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+):
+    tmp_path = await _spool_validated_upload(file)
+
+    # ✅ Generate document_id PER UPLOAD (FIX)
+    document_id = str(uuid.uuid4())
+
+    with stage_timer("enqueue"):
+        job = await _enqueue(tmp_path, file.filename, document_id, "ingest", _parse_tags(tags), tenant_id)
+    logger.info(f"Queued ingest job {job.id} for '{file.filename}'")
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Document uploaded and queued for indexing",
+            "filename": file.filename,
+            "document_id": document_id,   # ✅ RETURN IT
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/documents/jobs/{job.id}",
+        },
+    )
+
+# ==============================
+# RE-INDEX ENDPOINT
+# ==============================
+@router.put("/{document_id}")
+async def update_document(
+    document_id: str,
+    file: UploadFile = File(...),
+    tags: Optional[str] = Form(None),
+    tenant_id: Optional[str] = Form(None),
+    store=Depends(get_knowledge_store),
+):
+    """
+    Replace a document's content and tags/tenant. Only changed chunks are
+    embedded and upserted; chunks the new version no longer contains are deleted.
+    Cached answers for the document are invalidated when the job completes.
+    """
+    # Known if it has chunks, or is still queued from an upload that hasn't been indexed yet
+    known = await run_in_threadpool(job_service.document_has_jobs, document_id)
+    if not known:
+        known = bool(await run_in_threadpool(store.get_document_point_ids, document_id))
+    if not known:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    tmp_path = await _spool_validated_upload(file)
+
+    job = await _enqueue(tmp_path, file.filename, document_id, "reindex", _parse_tags(tags), tenant_id)
+    logger.info(f"Queued reindex job {job.id} for document_id='{document_id}'")
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Document update queued for re-indexing",
+            "filename": file.filename,
+            "document_id": document_id,
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/documents/jobs/{job.id}",
+        },
+    )
+
+# ==============================
+# JOB STATUS
+# ==============================
+@router.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = job_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_service.job_to_dict(job)
 
 # ==============================
 # TEST ENDPOINT
@@ -1,7 +1,65 @@
-from fastapi import APIRouter
+import os
+import time
+import asyncio
+
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from app.api.deps import get_clients
+from app.clients.registry import ClientRegistry, KNOWLEDGE_COLLECTION
+from app.services import job_service
 
 router = APIRouter()
 
+# Seconds each dependency check may take before it counts as failed
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+STARTED_AT = time.time()
+
+
+async def _check(fn) -> dict:
+    start = time.perf_counter()
+    try:
+        detail = await asyncio.wait_for(run_in_threadpool(fn), HEALTH_CHECK_TIMEOUT)
+        result = {"status": "ok", **(detail or {})}
+    except asyncio.TimeoutError:
+        result = {"status": "error", "error": f"timed out after {HEALTH_CHECK_TIMEOUT}s"}
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
 @router.get("/health")
-def health():
-    return {"status": "ok"}
+async def health(clients: ClientRegistry = Depends(get_clients)):
+    """
+    Readiness: the vector store and the job queue must answer. Returns 503
+    with per-dependency detail when either fails. The embedding model and
+    Groq key are reported but don't fail the check.
+    """
+    def vector_store():
+        return {
+            "backend": "local" if clients.local else "qdrant",
+            "points": clients.vector_store(KNOWLEDGE_COLLECTION).count(),
+        }
+
+    def job_queue():
+        return {"queued": job_service.count_jobs("queued"), "running": job_service.count_jobs("running")}
+
+    vector_check, queue_check = await asyncio.gather(_check(vector_store), _check(job_queue))
+    checks = {"vector_store": vector_check, "job_queue": queue_check}
+    healthy = all(c["status"] == "ok" for c in checks.values())
+
+    backend = clients.embed_client.backend
+    checks["embedding_model"] = {"status": "ok" if backend.loaded else "loading", "model": backend.model_name}
+    checks["llm"] = {"status": "ok" if os.getenv("GROQ_API_KEY") else "unconfigured"}
+
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={
+            "status": "ok" if healthy else "degraded",
+            "uptime_seconds": round(time.time() - STARTED_AT),
+            "checks": checks,
+        },
+    )
@@ -0,0 +1,156 @@
+import os
+import time
+import uuid
+import random
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app.core.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+UPSERT_PARALLELISM = int(os.getenv("UPSERT_PARALLELISM", "4"))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "3"))
+UPSERT_RETRY_BACKOFF = float(os.getenv("UPSERT_RETRY_BACKOFF", "0.5"))   # seconds, doubled per retry
+
+
+class UpsertReport(NamedTuple):
+    points: int
+    batches: int
+    retries: int
+    seconds: float
+
+    @property
+    def points_per_second(self) -> float:
+        return self.points / self.seconds if self.seconds else 0.0
+
+
+class BulkWriter:
+    """
+    Splits points into `batch_size` upserts and sends them over up to
+    `parallelism` concurrent connections. Failed batches are retried with
+    exponential backoff; a batch that still fails is raised from the next
+    submit() or from close(). Batches already written stay written.
+
+    submit() only blocks once 2 × parallelism batches are in flight, so the
+    caller can embed the next batch while earlier ones are uploading.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        batch_size: int = UPSERT_BATCH_SIZE,
+        parallelism: int = UPSERT_PARALLELISM,
+        max_retries: int = UPSERT_MAX_RETRIES,
+        backoff: float = UPSERT_RETRY_BACKOFF,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_in_flight = 2 * parallelism
+
+        self._pool = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="qdrant-upsert")
+        self._pending = deque()
+        self._started = time.perf_counter()
+        self.points = 0
+        self.batches = 0
+        self.retries = 0
+        self.report: Optional[UpsertReport] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _upsert_batch(self, ids: List[str], vectors: np.ndarray, payloads: List[dict]) -> int:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with stage_timer("vector_upsert"):
+                    # The float32 array goes through as is; retries and parallelism are handled here
+                    self.client.upload_collection(
+                        collection_name=self.collection_name,
+                        vectors=vectors,
+                        payload=payloads,
+                        ids=ids,
+                        batch_size=len(ids),
+                        parallel=1,
+                        max_retries=0,
+                        wait=True,
+                    )
+                return attempt
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.2)
+                logger.warning(
+                    f"Upsert of {len(ids)} points failed ({e}); retry {attempt + 1} in {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+    def _collect_oldest(self):
+        self.retries += self._pending.popleft().result()
+
+    def submit(
+        self,
+        vectors: Union[np.ndarray, List[List[float]]],
+        payloads: Sequence[dict],
+        ids: Optional[Sequence[str]] = None,
+    ):
+        """Queue points for upload; random UUIDs are used when `ids` is not given."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in payloads]
+
+        for start in range(0, len(ids), self.batch_size):
+            stop = start + self.batch_size
+            while len(self._pending) >= self.max_in_flight:
+                self._collect_oldest()
+            self._pending.append(
+                self._pool.submit(
+                    self._upsert_batch,
+                    list(ids[start:stop]),
+                    vectors[start:stop],
+                    list(payloads[start:stop]),
+                )
+            )
+            self.points += min(stop, len(ids)) - start
+            self.batches += 1
+
+    def close(self) -> UpsertReport:
+        """Wait for every batch and return throughput stats."""
+        if self.report is not None:
+            return self.report
+
+        try:
+            while self._pending:
+                self._collect_oldest()
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+        report = self.report = UpsertReport(
+            points=self.points,
+            batches=self.batches,
+            retries=self.retries,
+            seconds=time.perf_counter() - self._started,
+        )
+        logger.info(
+            f"Upserted {report.points} points to '{self.collection_name}' in {report.batches} batches "
+            f"({report.points_per_second:.0f} points/s, {report.retries} retries)"
+        )
+        return report
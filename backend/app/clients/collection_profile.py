@@ -0,0 +1,163 @@
+import os
+import json
+import logging
+from typing import Dict, NamedTuple, Optional
+
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Datatype,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+logger = logging.getLogger(__name__)
+
+VECTOR_SIZE = 384
+
+
+class CollectionProfile(NamedTuple):
+    """Storage, index and search settings for a collection."""
+    datatype: str = "float32"              # "float32" or "float16"; fixed once the collection exists
+    on_disk: bool = False                  # original vectors memory-mapped from disk instead of held in RAM
+    quantization: Optional[str] = None     # None, "scalar" (int8, 4x smaller) or "binary" (1 bit, 32x smaller)
+    quantization_always_ram: bool = True   # keep the quantized copy in RAM even when vectors are on disk
+    rescore: bool = True                   # re-rank quantized candidates with the original vectors
+    oversampling: float = 2.0              # candidates fetched per requested hit before rescoring
+    hnsw_m: int = 16                       # graph edges per node: more is better recall and more RAM
+    hnsw_ef_construct: int = 100           # build-time beam width: more is better recall and slower indexing
+    hnsw_on_disk: bool = False
+    search_ef: Optional[int] = None        # query-time beam width; None uses the server default
+    exact: bool = False                    # skip HNSW and scan every vector
+
+
+# ==============================
+# CONFIG
+# ==============================
+PROFILES: Dict[str, CollectionProfile] = {
+    "default": CollectionProfile(),
+    "float16": CollectionProfile(datatype="float16"),
+    # int8 copy in RAM for search, full vectors kept for rescoring
+    "int8": CollectionProfile(quantization="scalar", oversampling=1.5),
+    # int8 in RAM, float32 on disk: roughly a quarter of the vector RAM
+    "scalar-disk": CollectionProfile(on_disk=True, quantization="scalar", oversampling=2.0),
+    # 1-bit codes in RAM, everything else on disk; recall on 384-d MiniLM vectors relies on heavy oversampling
+    "binary-disk": CollectionProfile(on_disk=True, quantization="binary", oversampling=3.0, hnsw_on_disk=True),
+    "high-recall": CollectionProfile(hnsw_m=32, hnsw_ef_construct=256, search_ef=256),
+}
+
+# Extra or overridden profiles, e.g. COLLECTION_PROFILES='{"tight": {"quantization": "scalar", "search_ef": 64}}'
+for _name, _spec in json.loads(os.getenv("COLLECTION_PROFILES", "{}")).items():
+    PROFILES[_name] = CollectionProfile(**_spec)
+
+# Profile for new collections and for search parameters; VECTOR_DATATYPE is the older spelling
+COLLECTION_PROFILE = os.getenv(
+    "COLLECTION_PROFILE",
+    {"float16": "float16", "int8": "int8"}.get(os.getenv("VECTOR_DATATYPE", "").lower(), "default"),
+)
+
+# Search-time overrides of the active profile's ef / exact
+SEARCH_HNSW_EF = os.getenv("SEARCH_HNSW_EF")
+SEARCH_EXACT = os.getenv("SEARCH_EXACT")
+
+
+def get_profile(name: Optional[str] = None) -> CollectionProfile:
+    name = name or COLLECTION_PROFILE
+    if name not in PROFILES:
+        raise KeyError(f"Unknown collection profile '{name}' (available: {', '.join(sorted(PROFILES))})")
+    profile = PROFILES[name]
+    if name == COLLECTION_PROFILE:
+        if SEARCH_HNSW_EF:
+            profile = profile._replace(search_ef=int(SEARCH_HNSW_EF))
+        if SEARCH_EXACT:
+            profile = profile._replace(exact=SEARCH_EXACT.lower() == "true")
+    return profile
+
+
+def _quantization_config(profile: CollectionProfile):
+    if profile.quantization == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,
+                always_ram=profile.quantization_always_ram,
+            )
+        )
+    if profile.quantization == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=profile.quantization_always_ram))
+    if profile.quantization is None:
+        return None
+    raise ValueError(f"Unsupported quantization '{profile.quantization}'")
+
+
+def _hnsw_config(profile: CollectionProfile) -> HnswConfigDiff:
+    return HnswConfigDiff(m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct, on_disk=profile.hnsw_on_disk)
+
+
+def create_collection_kwargs(profile: CollectionProfile) -> dict:
+    """Arguments for `create_collection` that realize a profile."""
+    return {
+        "vectors_config": VectorParams(
+            size=VECTOR_SIZE,
+            distance=Distance.COSINE,
+            datatype=Datatype.FLOAT16 if profile.datatype == "float16" else None,
+            on_disk=profile.on_disk,
+        ),
+        "hnsw_config": _hnsw_config(profile),
+        "quantization_config": _quantization_config(profile),
+    }
+
+
+def update_collection_kwargs(profile: CollectionProfile) -> dict:
+    """
+    Arguments for `update_collection` that move an existing collection to a
+    profile in place. Quantization, on-disk storage and HNSW settings change
+    while the collection keeps serving; segments are rebuilt in the background.
+    """
+    return {
+        # "" is the collection's single unnamed vector
+        "vectors_config": {"": VectorParamsDiff(on_disk=profile.on_disk)},
+        "hnsw_config": _hnsw_config(profile),
+        "quantization_config": _quantization_config(profile) or Disabled.DISABLED,
+    }
+
+
+def search_params(
+    profile: CollectionProfile,
+    hnsw_ef: Optional[int] = None,
+    exact: Optional[bool] = None,
+) -> SearchParams:
+    """Query parameters for a profile, with optional per-call ef / exact overrides."""
+    quantization = None
+    if profile.quantization is not None:
+        quantization = QuantizationSearchParams(rescore=profile.rescore, oversampling=profile.oversampling)
+    return SearchParams(
+        hnsw_ef=hnsw_ef if hnsw_ef is not None else profile.search_ef,
+        exact=exact if exact is not None else profile.exact,
+        quantization=quantization,
+    )
+
+
+def describe_collection(info) -> dict:
+    """Storage, index and optimizer state of a collection from `get_collection`."""
+    params = info.config.params.vectors
+    quantization = info.config.quantization_config or getattr(params, "quantization_config", None)
+    hnsw = getattr(params, "hnsw_config", None) or info.config.hnsw_config
+    return {
+        "status": str(getattr(info.status, "value", info.status)),
+        "optimizer_status": str(info.optimizer_status),
+        "points": info.points_count,
+        "indexed_vectors": info.indexed_vectors_count,
+        "datatype": str(getattr(params.datatype, "value", params.datatype or "float32")),
+        "on_disk": bool(params.on_disk),
+        "quantization": type(quantization).__name__ if quantization is not None else None,
+        "hnsw": {"m": hnsw.m, "ef_construct": hnsw.ef_construct, "on_disk": hnsw.on_disk},
+    }
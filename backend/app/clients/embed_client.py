@@ -1,17 +1,271 @@
-from fastembed import TextEmbedding
-from typing import List
+from typing import Dict, List, Optional, Type
+import asyncio
+import contextvars
 import logging
+import os
+import threading
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.metrics import EMBED_BATCH_TEXTS, stage_timer
+from app.services.chunk_service import SPECIAL_TOKENS, estimate_tokens
+from app.services.embedding_cache_service import get_embedding_cache
 
 logger = logging.getLogger(__name__)
 
+# ==============================
+# CONFIG
+# ==============================
+# One embedding backend is loaded per process; only its libraries are imported
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "fastembed")
+MODEL_NAME = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_DIM = 384
+
+# Intra-op threads for the model runtime (0 = library default) and texts per forward pass
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Query micro-batching: wait at most MAX_WAIT_MS for up to MAX_SIZE queries per model call
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+
+# ==============================
+# BACKENDS
+# ==============================
+class EmbeddingBackend:
+    """A model runtime. The model is loaded on first use, once per process."""
+
+    name = ""
+
+    def __init__(self, model_name: str = MODEL_NAME, threads: int = EMBED_THREADS, batch_size: int = EMBED_BATCH_SIZE):
+        self.model_name = model_name
+        self.threads = threads or None
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        raise NotImplementedError
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    logger.info(f"Loading embedding model {self.model_name} ({self.name})...")
+                    self._model = self._load()
+                    logger.info("Model loaded!")
+        return self._model
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def count_tokens(self, text: str) -> int:
+        """Model tokens in `text`, excluding special tokens."""
+        return estimate_tokens(text)
+
+
+class FastEmbedBackend(EmbeddingBackend):
+    """ONNX Runtime on CPU via fastembed (default)."""
+
+    name = "fastembed"
+
+    def _load(self):
+        from fastembed import TextEmbedding
+
+        return TextEmbedding(model_name=self.model_name, threads=self.threads)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.embed(texts, batch_size=self.batch_size)
+        return np.stack(list(vectors)).astype(np.float32, copy=False)
+
+    def count_tokens(self, text: str) -> int:
+        return self.model.token_count(text) - SPECIAL_TOKENS
+
+
+class SentenceTransformersBackend(EmbeddingBackend):
+    """PyTorch via sentence-transformers."""
+
+    name = "sentence-transformers"
+
+    def _load(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        return SentenceTransformer(self.model_name)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+        return vectors.astype(np.float32, copy=False)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.model.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+EMBED_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    FastEmbedBackend.name: FastEmbedBackend,
+    SentenceTransformersBackend.name: SentenceTransformersBackend,
+}
+
+
+def register_embed_backend(name: str, backend: Type[EmbeddingBackend]):
+    EMBED_BACKENDS[name] = backend
+
+
+_backend: Optional[EmbeddingBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_embed_backend() -> EmbeddingBackend:
+    """Process-wide backend selected by EMBED_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if EMBED_BACKEND not in EMBED_BACKENDS:
+                    raise ValueError(
+                        f"Unknown EMBED_BACKEND '{EMBED_BACKEND}' (available: {', '.join(EMBED_BACKENDS)})"
+                    )
+                _backend = EMBED_BACKENDS[EMBED_BACKEND]()
+    return _backend
+
+
 class EmbedClient:
-    _model = None
-
-    def embed(self, texts: List[str]) -> List[List[float]]:
-        if EmbedClient._model is None:
-            logger.info("Loading lightweight embedding model (fast first time)...")
-            # ← CHANGE THIS LINE ONLY
-            EmbedClient._model = TextEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
-            logger.info("Model loaded!")
-        embeddings = list(EmbedClient._model.embed(texts))
-        return [emb.tolist() for emb in embeddings]
\ No newline at end of file
+    """Embeds through the shared backend and the embedding cache."""
+
+    def __init__(self, backend: Optional[EmbeddingBackend] = None):
+        self.backend = backend or get_embed_backend()
+
+    @property
+    def cache_namespace(self) -> str:
+        # Backends produce slightly different vectors for the same model
+        return f"{self.backend.name}:{self.backend.model_name}"
+
+    def warmup(self):
+        """Load the model and run it once so the first request doesn't pay for it."""
+        self.backend.embed(["warmup text to load model"])
+
+    def count_tokens(self, text: str) -> int:
+        """Model tokens in `text`, excluding [CLS]/[SEP]."""
+        return self.backend.count_tokens(text)
+
+    def embed(self, texts: List[str], use_cache: bool = True) -> np.ndarray:
+        """
+        Embed texts into a contiguous float32 (len(texts), EMBED_DIM) array.
+        Pass use_cache=False for query embeddings: every cache hit is a write
+        under the cache's lock, and repeated questions are answered by the
+        semantic cache before they'd benefit from it.
+        """
+        if not texts:
+            return np.empty((0, EMBED_DIM), dtype=np.float32)
+        cache = get_embedding_cache() if use_cache else None
+        if cache is None:
+            return self._embed_uncached(texts)
+        return cache.embed(self.cache_namespace, texts, self._embed_uncached)
+
+    def _embed_uncached(self, texts: List[str]) -> np.ndarray:
+        # Only model calls are timed; texts served from the cache never get here
+        EMBED_BATCH_TEXTS.observe(len(texts))
+        with stage_timer("embed"):
+            return self.backend.embed(texts)
+
+
+class EmbedBatcher:
+    """
+    Coalesces single-query embeds from concurrent requests into one batched
+    model call. While a batch is being embedded the next one accumulates.
+    """
+
+    def __init__(
+        self,
+        client: Optional[EmbedClient] = None,
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS,
+    ):
+        self.client = client or EmbedClient()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # Fresh context: the batcher outlives the request that started it and must not add to its trace
+            self._task = loop.create_task(self._run(), context=contextvars.Context())
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def _collect_batch(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            # Skip requests whose callers have already gone away
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            try:
+                vectors = await run_in_threadpool(
+                    self.client.embed, [text for text, _ in batch], use_cache=False
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_batcher: Optional[EmbedBatcher] = None
+
+
+def get_embed_batcher() -> EmbedBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbedBatcher()
+    return _batcher
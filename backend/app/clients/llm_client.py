@@ -1,37 +1,171 @@
-from groq import Groq
+from groq import AsyncGroq, DefaultAsyncHttpxClient, DefaultHttpxClient, Groq
+from typing import AsyncIterator, Iterator, List
+import httpx
 import os
+import time
+
+from app.core.metrics import LLM_FIRST_TOKEN, LLM_TOKENS, LLM_TOKENS_ESTIMATED, observe_stage
+from app.core.tokens import count_tokens
+
+# Per-request timeout (seconds), retries, and pooled connections to the Groq API
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "100"))
 
 class LLMClient:
     def __init__(self, model: str = "llama-3.3-70b-versatile"):
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise ValueError("GROQ_API_KEY environment variable not set")
-        self.client = Groq(api_key=api_key)
+
+        limits = httpx.Limits(
+            max_connections=LLM_POOL_SIZE,
+            max_keepalive_connections=LLM_POOL_SIZE,
+        )
+        self.client = Groq(
+            api_key=api_key,
+            timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=DefaultHttpxClient(limits=limits),
+        )
+        self.async_client = AsyncGroq(
+            api_key=api_key,
+            timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(limits=limits),
+        )
         self.model = model
 
+    @staticmethod
+    def _record_usage(usage, prompt: str, completion: str):
+        if usage is not None:
+            LLM_TOKENS.labels("prompt").inc(usage.prompt_tokens or 0)
+            LLM_TOKENS.labels("completion").inc(usage.completion_tokens or 0)
+        else:
+            LLM_TOKENS_ESTIMATED.labels("prompt").inc(count_tokens(prompt))
+            LLM_TOKENS_ESTIMATED.labels("completion").inc(count_tokens(completion or ""))
+
+    @staticmethod
+    def _chunk_usage(chunk):
+        # Groq puts usage on the final chunk under x_groq; OpenAI-style `usage` with include_usage
+        usage = getattr(chunk, "usage", None)
+        if usage is None:
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+        return usage
+
+    def _request(self, prompt: str) -> dict:
+        return {
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "model": self.model,
+            "temperature": 0.3,      # Low for factual answers
+            "max_tokens": 1024,
+            "top_p": 1,
+        }
+
     def generate(self, prompt: str) -> str:
         """
         Generate answer using Groq LLM.
         prompt: Full context + question string
         """
+        start = time.perf_counter()
         try:
-            messages = [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-
             response = self.client.chat.completions.create(
-                messages=messages,
-                model=self.model,
-                temperature=0.3,      # Low for factual answers
-                max_tokens=1024,
-                top_p=1,
+                **self._request(prompt),
+                stream=False,
+            )
+            answer = response.choices[0].message.content
+            self._record_usage(getattr(response, "usage", None), prompt, answer)
+
+            return answer.strip()
+
+        except Exception as e:
+            raise RuntimeError(f"Groq API error: {str(e)}")
+
+        finally:
+            observe_stage("llm", time.perf_counter() - start)
+
+    async def agenerate(self, prompt: str) -> str:
+        """
+        Async variant of generate(); runs on the event loop without a worker thread.
+        """
+        start = time.perf_counter()
+        try:
+            response = await self.async_client.chat.completions.create(
+                **self._request(prompt),
                 stream=False,
             )
+            answer = response.choices[0].message.content
+            self._record_usage(getattr(response, "usage", None), prompt, answer)
+
+            return answer.strip()
+
+        except Exception as e:
+            raise RuntimeError(f"Groq API error: {str(e)}")
+
+        finally:
+            observe_stage("llm", time.perf_counter() - start)
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield answer tokens as Groq produces them.
+        """
+        start = time.perf_counter()
+        parts: List[str] = []
+        usage = None
+        try:
+            stream = self.client.chat.completions.create(
+                **self._request(prompt),
+                stream=True,
+            )
+            for chunk in stream:
+                usage = self._chunk_usage(chunk) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        LLM_FIRST_TOKEN.observe(time.perf_counter() - start)
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+
+        except Exception as e:
+            raise RuntimeError(f"Groq API error: {str(e)}")
 
-            return response.choices[0].message.content.strip()
+        finally:
+            observe_stage("llm", time.perf_counter() - start)
+            self._record_usage(usage, prompt, "".join(parts))
+
+    async def agenerate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Async variant of generate_stream().
+        """
+        start = time.perf_counter()
+        parts: List[str] = []
+        usage = None
+        try:
+            stream = await self.async_client.chat.completions.create(
+                **self._request(prompt),
+                stream=True,
+            )
+            async for chunk in stream:
+                usage = self._chunk_usage(chunk) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        LLM_FIRST_TOKEN.observe(time.perf_counter() - start)
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
 
         except Exception as e:
-            raise RuntimeError(f"Groq API error: {str(e)}")
\ No newline at end of file
+            raise RuntimeError(f"Groq API error: {str(e)}")
+
+        finally:
+            observe_stage("llm", time.perf_counter() - start)
+            self._record_usage(usage, prompt, "".join(parts))
+
+    def close(self):
+        self.client.close()
+
+    async def aclose(self):
+        await self.async_client.close()
@@ -0,0 +1,507 @@
+import os
+import json
+import shutil
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use is on the operator
+    fcntl = None
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from qdrant_client.models import (
+    Batch,
+    FieldCondition,
+    Filter,
+    HasIdCondition,
+    MatchAny,
+    MatchValue,
+    Record,
+    ScoredPoint,
+)
+
+from app.clients.bulk_writer import BulkWriter, UpsertReport
+from app.clients.vector_client import _payload_point_ids
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+LOCAL_VECTOR_DIR = os.getenv("LOCAL_VECTOR_DIR", "./vector_data")
+
+# Collections with at least this many points are searched through an IVF index instead of brute force
+LOCAL_IVF_THRESHOLD = int(os.getenv("LOCAL_IVF_THRESHOLD", "20000"))
+# Clusters scanned per query; higher is more accurate and slower
+LOCAL_IVF_NPROBE = int(os.getenv("LOCAL_IVF_NPROBE", "8"))
+
+VECTOR_DIM = 384
+INITIAL_CAPACITY = 1024
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 50000
+
+# Payload keys stored in their own indexed columns
+_KEYWORD_COLUMNS = ("document_id", "tenant_id")
+
+
+class CollectionLockedError(RuntimeError):
+    pass
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalVectorStore:
+    """
+    In-process vector store with the same API as VectorStore, for development,
+    CI, edge deployments and offline benchmarks. Cosine similarity only.
+
+    Vectors are normalized float32 rows in a memory-mapped file, one slot per
+    point. Payloads live in SQLite with indexed document_id / tenant_id
+    columns and a tag table, so Qdrant filters on those keys become indexed
+    lookups. Search is exact NumPy top-k; unfiltered searches on collections
+    of LOCAL_IVF_THRESHOLD points or more go through a k-means IVF index that
+    scans only the LOCAL_IVF_NPROBE closest clusters.
+
+    Single-process only: slot allocation and the live-slot mask are read from
+    SQLite once and then kept in memory, so a second process writing the same
+    collection would hand out colliding slots and never see the other's
+    points. Each collection directory is locked on open; a second process
+    (an external ingest worker, another uvicorn worker) fails with
+    CollectionLockedError instead of corrupting it.
+    """
+
+    def __init__(self, collection_name: str = "documents", root: str = LOCAL_VECTOR_DIR, dim: int = VECTOR_DIM):
+        self.collection_name = collection_name
+        self.dim = dim
+        self.path = os.path.join(root, collection_name)
+        os.makedirs(self.path, exist_ok=True)
+        self._lock_file = self._acquire_process_lock()
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(self.path, "points.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS points (
+                slot INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                document_id TEXT,
+                tenant_id TEXT,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_points_document ON points (document_id);
+            CREATE INDEX IF NOT EXISTS idx_points_tenant ON points (tenant_id);
+            CREATE TABLE IF NOT EXISTS point_tags (
+                tag TEXT NOT NULL,
+                slot INTEGER NOT NULL,
+                PRIMARY KEY (tag, slot)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_point_tags_slot ON point_tags (slot);
+            """
+        )
+        self._db.commit()
+
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._open_vectors()
+
+        slots = np.array([r[0] for r in self._db.execute("SELECT slot FROM points")], dtype=np.int64)
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._alive[slots] = True
+        self._next_slot = int(slots.max()) + 1 if len(slots) else 0
+        self._free: List[int] = np.flatnonzero(~self._alive[:self._next_slot]).tolist()
+
+        # IVF state: centroids (nlist × dim) and the cluster of every slot (-1 = unassigned)
+        self._centroids: Optional[np.ndarray] = None
+        self._assign: Optional[np.ndarray] = None
+        self._indexed_count = 0
+
+    def _acquire_process_lock(self):
+        lock_file = open(os.path.join(self.path, ".lock"), "w")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise CollectionLockedError(
+                    f"Local collection '{self.collection_name}' is open in another process; "
+                    "VECTOR_BACKEND=local is single-process only (run the ingest worker in-process "
+                    "with one API worker, or use Qdrant)"
+                )
+        return lock_file
+
+    # ---------- VECTOR FILE ----------
+    def _open_vectors(self, capacity: int = 0):
+        if not os.path.exists(self._vectors_path):
+            open(self._vectors_path, "wb").close()
+        size = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        capacity = max(capacity, size, INITIAL_CAPACITY)
+        if capacity > size:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(capacity * 4 * self.dim)
+        self._capacity = capacity
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _grow(self, needed: int):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        self._vectors.flush()
+        del self._vectors
+        self._open_vectors(capacity)
+
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._alive = alive
+        if self._assign is not None:
+            assign = np.full(capacity, -1, dtype=np.int32)
+            assign[:len(self._assign)] = self._assign
+            self._assign = assign
+
+    def _allocate(self, count: int) -> List[int]:
+        slots = []
+        while self._free and len(slots) < count:
+            slots.append(self._free.pop())
+        extra = count - len(slots)
+        if extra:
+            if self._next_slot + extra > self._capacity:
+                self._grow(self._next_slot + extra)
+            slots.extend(range(self._next_slot, self._next_slot + extra))
+            self._next_slot += extra
+        return slots
+
+    # ---------- FILTERS ----------
+    def _condition_sql(self, condition) -> Tuple[str, list]:
+        if isinstance(condition, Filter):
+            sql, params = self._filter_sql(condition)
+            return f"({sql})", params
+
+        if isinstance(condition, HasIdCondition):
+            ids = [str(i) for i in condition.has_id]
+            return f"id IN ({','.join('?' * len(ids))})", ids
+
+        if isinstance(condition, FieldCondition):
+            if isinstance(condition.match, MatchValue):
+                values = [condition.match.value]
+            elif isinstance(condition.match, MatchAny):
+                values = list(condition.match.any)
+            else:
+                raise ValueError(f"Unsupported match for the local vector store: {condition.match!r}")
+            placeholders = ",".join("?" * len(values))
+
+            if condition.key in _KEYWORD_COLUMNS:
+                return f"{condition.key} IN ({placeholders})", [str(v) for v in values]
+            if condition.key == "tags":
+                return f"slot IN (SELECT slot FROM point_tags WHERE tag IN ({placeholders}))", [str(v) for v in values]
+            return f"json_extract(payload, ?) IN ({placeholders})", [f'$."{condition.key}"', *values]
+
+        raise ValueError(f"Unsupported filter condition for the local vector store: {type(condition).__name__}")
+
+    def _filter_sql(self, query_filter: Filter) -> Tuple[str, list]:
+        parts, params = [], []
+        for condition in _as_list(query_filter.must):
+            sql, p = self._condition_sql(condition)
+            parts.append(sql)
+            params += p
+
+        for key, negate in (("should", False), ("must_not", True)):
+            conditions = _as_list(getattr(query_filter, key))
+            if not conditions:
+                continue
+            alternatives = []
+            for condition in conditions:
+                sql, p = self._condition_sql(condition)
+                alternatives.append(sql)
+                params += p
+            clause = "(" + " OR ".join(alternatives) + ")"
+            parts.append(f"NOT {clause}" if negate else clause)
+
+        return " AND ".join(parts) or "1", params
+
+    def _filtered_slots(self, query_filter: Filter) -> np.ndarray:
+        sql, params = self._filter_sql(query_filter)
+        rows = self._db.execute(f"SELECT slot FROM points WHERE {sql}", params)
+        return np.fromiter((r[0] for r in rows), dtype=np.int64)
+
+    # ---------- WRITES ----------
+    def upsert(self, collection_name: str, points: Batch, wait: bool = True):
+        """QdrantClient-compatible upsert."""
+        self._write(points.ids, np.asarray(points.vectors, dtype=np.float32), points.payloads)
+
+    def upload_collection(self, collection_name: str, vectors, payload=None, ids=None, **kwargs):
+        """QdrantClient-compatible array upload, so BulkWriter can write to this store."""
+        self._write(ids, np.asarray(vectors, dtype=np.float32), payload)
+
+    def _write(self, ids, vectors: np.ndarray, payloads: Optional[List[dict]]):
+        ids = [str(i) for i in ids]
+        vectors = _normalize(vectors.reshape(len(ids), self.dim))
+        payloads = payloads or [{} for _ in ids]
+
+        with self._lock:
+            existing = dict(
+                self._db.execute(
+                    f"SELECT id, slot FROM points WHERE id IN ({','.join('?' * len(ids))})", ids
+                ).fetchall()
+            )
+            new_slots = iter(self._allocate(sum(1 for i in ids if i not in existing)))
+            slots = [existing[i] if i in existing else next(new_slots) for i in ids]
+
+            self._vectors[slots] = vectors
+            self._vectors.flush()
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO points (slot, id, document_id, tenant_id, payload) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        slot,
+                        pid,
+                        None if p.get("document_id") is None else str(p["document_id"]),
+                        None if p.get("tenant_id") is None else str(p["tenant_id"]),
+                        json.dumps(p),
+                    )
+                    for slot, pid, p in zip(slots, ids, payloads)
+                ],
+            )
+            self._db.executemany("DELETE FROM point_tags WHERE slot = ?", [(s,) for s in slots])
+            self._db.executemany(
+                "INSERT OR IGNORE INTO point_tags (tag, slot) VALUES (?, ?)",
+                [(str(tag), slot) for slot, p in zip(slots, payloads) for tag in p.get("tags") or []],
+            )
+            self._db.commit()
+
+            self._alive[slots] = True
+            if self._centroids is not None:
+                self._assign[slots] = np.argmax(vectors @ self._centroids.T, axis=1)
+
+    def bulk_writer(self, **kwargs) -> BulkWriter:
+        # Writes are serialized by the store lock; one writer thread still overlaps them with embedding
+        kwargs.setdefault("parallelism", 1)
+        return BulkWriter(self, self.collection_name, **kwargs)
+
+    def add_embeddings(
+        self,
+        embeddings: Union[np.ndarray, List[List[float]]],
+        payloads: List[dict],
+        ids: Optional[List[str]] = None,
+    ) -> UpsertReport:
+        if ids is None:
+            ids = _payload_point_ids(payloads)
+
+        with self.bulk_writer() as writer:
+            writer.submit(embeddings, payloads, ids)
+        return writer.report
+
+    def get_document_point_ids(self, document_id) -> Set[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT id FROM points WHERE document_id = ?", (str(document_id),))
+            return {r[0] for r in rows}
+
+    def get_document_chunk_indexes(self, document_id) -> Dict[str, Optional[int]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, json_extract(payload, '$.chunk_index') FROM points WHERE document_id = ?",
+                (str(document_id),),
+            )
+            return dict(rows.fetchall())
+
+    def set_chunk_indexes(self, indexes: Dict[str, int], batch_size: int = 1000):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE points SET payload = json_set(payload, '$.chunk_index', ?) WHERE id = ?",
+                [(index, pid) for pid, index in indexes.items()],
+            )
+            self._db.commit()
+
+    def delete_points(self, ids: Iterable[str], batch_size: int = 1000) -> int:
+        ids = [str(i) for i in ids]
+        deleted = 0
+        with self._lock:
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start:start + batch_size]
+                slots = [
+                    r[0]
+                    for r in self._db.execute(
+                        f"SELECT slot FROM points WHERE id IN ({','.join('?' * len(batch))})", batch
+                    )
+                ]
+                self._db.executemany("DELETE FROM points WHERE slot = ?", [(s,) for s in slots])
+                self._db.executemany("DELETE FROM point_tags WHERE slot = ?", [(s,) for s in slots])
+                self._alive[slots] = False
+                self._vectors[slots] = 0.0
+                self._free.extend(slots)
+                deleted += len(slots)
+            self._db.commit()
+            self._vectors.flush()
+        return deleted
+
+    def set_document_payload(self, document_id, payload: dict):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT slot, payload FROM points WHERE document_id = ?", (str(document_id),)
+            ).fetchall()
+            for slot, stored in rows:
+                merged = {**json.loads(stored), **payload}
+                self._db.execute(
+                    "UPDATE points SET payload = ?, tenant_id = ? WHERE slot = ?",
+                    (
+                        json.dumps(merged),
+                        None if merged.get("tenant_id") is None else str(merged["tenant_id"]),
+                        slot,
+                    ),
+                )
+                if "tags" in payload:
+                    self._db.execute("DELETE FROM point_tags WHERE slot = ?", (slot,))
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO point_tags (tag, slot) VALUES (?, ?)",
+                        [(str(tag), slot) for tag in payload["tags"] or []],
+                    )
+            self._db.commit()
+
+    # ---------- READS ----------
+    def count(self) -> int:
+        with self._lock:
+            return int(self._alive.sum())
+
+    def retrieve(self, ids: List[str], query_filter: Optional[Filter] = None) -> List[Record]:
+        if not ids:
+            return []
+        ids = [str(i) for i in ids]
+        sql = f"id IN ({','.join('?' * len(ids))})"
+        params: list = list(ids)
+        if query_filter is not None:
+            filter_sql, filter_params = self._filter_sql(query_filter)
+            sql += f" AND ({filter_sql})"
+            params += filter_params
+
+        with self._lock:
+            rows = self._db.execute(f"SELECT id, payload FROM points WHERE {sql}", params).fetchall()
+        return [Record(id=pid, payload=json.loads(payload)) for pid, payload in rows]
+
+    def search(
+        self,
+        query_vector: Union[np.ndarray, List[float]],
+        limit: int = 5,
+        query_filter: Optional[Filter] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None,
+    ) -> List[ScoredPoint]:
+        # hnsw_ef has no local equivalent; exact skips the IVF index
+        try:
+            query = _normalize(np.asarray(query_vector, dtype=np.float32).ravel())
+            with self._lock:
+                if query_filter is not None:
+                    candidates = self._filtered_slots(query_filter)
+                elif not exact and self._alive.sum() >= LOCAL_IVF_THRESHOLD:
+                    candidates = self._ivf_candidates(query)
+                else:
+                    candidates = None
+
+                if candidates is None:
+                    # Every live slot: score the contiguous prefix and mask holes left by deletions
+                    scores = self._vectors[:self._next_slot] @ query
+                    scores[~self._alive[:self._next_slot]] = -np.inf
+                    slots = np.arange(self._next_slot)
+                else:
+                    slots = candidates
+                    scores = self._vectors[slots] @ query if len(slots) else np.empty(0, dtype=np.float32)
+
+                k = min(limit, int(np.isfinite(scores).sum()))
+                if k <= 0:
+                    return []
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+
+                top_slots = [int(s) for s in slots[top]]
+                rows = dict(
+                    (slot, (pid, payload))
+                    for slot, pid, payload in self._db.execute(
+                        f"SELECT slot, id, payload FROM points WHERE slot IN ({','.join('?' * len(top_slots))})",
+                        top_slots,
+                    )
+                )
+
+            return [
+                ScoredPoint(id=rows[slot][0], version=0, score=float(score), payload=json.loads(rows[slot][1]))
+                for slot, score in zip(top_slots, scores[top])
+                if slot in rows
+            ]
+        except Exception as e:
+            logger.error(f"Local search error: {e}")
+            return []
+
+    async def asearch(
+        self,
+        query_vector: Union[np.ndarray, List[float]],
+        limit: int = 5,
+        query_filter: Optional[Filter] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None,
+    ) -> List[ScoredPoint]:
+        return await run_in_threadpool(self.search, query_vector, limit, query_filter, hnsw_ef, exact)
+
+    async def aretrieve(self, ids: List[str], query_filter: Optional[Filter] = None) -> List[Record]:
+        return await run_in_threadpool(self.retrieve, ids, query_filter)
+
+    # ---------- IVF INDEX ----------
+    def build_index(self):
+        """(Re)train the IVF clusters on the live vectors; called automatically as the collection grows."""
+        with self._lock:
+            live = np.flatnonzero(self._alive[:self._next_slot])
+            if not len(live):
+                return
+            nlist = int(np.clip(np.sqrt(len(live)), 16, 4096))
+            rng = np.random.default_rng(0)
+            sample = self._vectors[rng.choice(live, min(len(live), KMEANS_SAMPLE), replace=False)]
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+            # Spherical k-means: assign by cosine, re-centre, re-normalize
+            for _ in range(KMEANS_ITERATIONS):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = sample[labels == c]
+                    centroids[c] = members.mean(axis=0) if len(members) else sample[rng.integers(len(sample))]
+                centroids = _normalize(centroids)
+
+            assign = np.full(self._capacity, -1, dtype=np.int32)
+            for start in range(0, len(live), 65536):
+                block = live[start:start + 65536]
+                assign[block] = np.argmax(self._vectors[block] @ centroids.T, axis=1)
+
+            self._centroids, self._assign, self._indexed_count = centroids, assign, len(live)
+            logger.info(f"Built IVF index for '{self.collection_name}': {len(live)} points, {nlist} lists")
+
+    def _ivf_candidates(self, query: np.ndarray) -> np.ndarray:
+        # Retrain once the collection has doubled since the last build
+        if self._centroids is None or self._alive.sum() > 2 * self._indexed_count:
+            self.build_index()
+        nprobe = min(LOCAL_IVF_NPROBE, len(self._centroids))
+        probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        in_probes = np.isin(self._assign[:self._next_slot], probes)
+        return np.flatnonzero(in_probes & self._alive[:self._next_slot])
+
+    # ---------- LIFECYCLE ----------
+    def close(self):
+        with self._lock:
+            self._vectors.flush()
+            self._db.close()
+            # Closing the file releases the flock
+            self._lock_file.close()
+
+    def drop(self):
+        """Delete the collection's files."""
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,114 @@
+import os
+import threading
+from typing import Dict, List, Optional, Union
+
+from app.clients.embed_client import EmbedClient
+from app.clients.llm_client import LLMClient
+from app.clients.local_vector_store import LOCAL_VECTOR_DIR, LocalVectorStore
+from app.clients.vector_client import VectorStore, create_async_qdrant_client, create_qdrant_client
+from app.services.lexical_index_service import get_lexical_index
+
+# Collection used by the upload and chat endpoints
+KNOWLEDGE_COLLECTION = "enterprise_knowledge"
+
+# "qdrant" (server at QDRANT_URL) or "local" (in-process store under LOCAL_VECTOR_DIR, no server).
+# The local store is single-process: one API worker with INGEST_WORKER_MODE=inprocess.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant").lower()
+
+
+class ClientRegistry:
+    """
+    Application-scoped clients. One pooled Qdrant connection (sync and async)
+    is shared by every VectorStore, and each collection/index is checked once
+    per process. With VECTOR_BACKEND=local no Qdrant client is created and
+    collections are LocalVectorStores.
+    """
+
+    def __init__(self):
+        self.local = VECTOR_BACKEND == "local"
+        self.qdrant = None if self.local else create_qdrant_client()
+        self.async_qdrant = None if self.local else create_async_qdrant_client()
+        self.embed_client = EmbedClient()
+        self._vector_stores: Dict[str, Union[VectorStore, LocalVectorStore]] = {}
+        self._llm_client: Optional[LLMClient] = None
+        self._lock = threading.Lock()
+
+    def vector_store(self, collection_name: str = KNOWLEDGE_COLLECTION) -> Union[VectorStore, LocalVectorStore]:
+        store = self._vector_stores.get(collection_name)
+        if store is None:
+            with self._lock:
+                store = self._vector_stores.get(collection_name)
+                if store is None:
+                    if self.local:
+                        store = LocalVectorStore(collection_name)
+                    else:
+                        store = VectorStore(
+                            collection_name=collection_name,
+                            client=self.qdrant,
+                            async_client=self.async_qdrant,
+                        )
+                    self._vector_stores[collection_name] = store
+        return store
+
+    def collection_names(self) -> List[str]:
+        if self.local:
+            if not os.path.isdir(LOCAL_VECTOR_DIR):
+                return []
+            return sorted(
+                name for name in os.listdir(LOCAL_VECTOR_DIR)
+                if os.path.isdir(os.path.join(LOCAL_VECTOR_DIR, name))
+            )
+        return [c.name for c in self.qdrant.get_collections().collections]
+
+    def drop_collection(self, collection_name: str):
+        """Delete a collection; the next vector_store() call recreates it."""
+        with self._lock:
+            store = self._vector_stores.pop(collection_name, None)
+        if self.local:
+            (store or LocalVectorStore(collection_name)).drop()
+        else:
+            self.qdrant.delete_collection(collection_name)
+        lexical = get_lexical_index(collection_name)
+        if lexical is not None:
+            lexical.clear()
+
+    def llm_client(self) -> LLMClient:
+        # Created on first use so the API can start without GROQ_API_KEY
+        if self._llm_client is None:
+            with self._lock:
+                if self._llm_client is None:
+                    self._llm_client = LLMClient()
+        return self._llm_client
+
+    async def aclose(self):
+        if self.local:
+            for store in self._vector_stores.values():
+                store.close()
+        else:
+            self.qdrant.close()
+            await self.async_qdrant.close()
+        if self._llm_client is not None:
+            self._llm_client.close()
+            await self._llm_client.aclose()
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ClientRegistry:
+    """Process-wide registry; created by the API lifespan or on first use (worker, services)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ClientRegistry()
+    return _registry
+
+
+async def aclose_registry():
+    global _registry
+    with _registry_lock:
+        registry, _registry = _registry, None
+    if registry is not None:
+        await registry.aclose()
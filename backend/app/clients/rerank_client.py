@@ -0,0 +1,140 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from qdrant_client.models import ScoredPoint
+
+from app.core.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+# Off by default: the cross-encoder adds CPU time per query in exchange for precision
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2")
+
+# Retrieval returns this many candidates when reranking; only RERANK_TOP_K reach the prompt
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "5"))
+
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+RERANK_THREADS = int(os.getenv("RERANK_THREADS", "0")) or None
+
+
+class RerankClient:
+    """
+    Cross-encoder scoring of (query, chunk) pairs on CPU through fastembed's
+    ONNX runtime. All uncached pairs of a query are scored in one batched call,
+    and pair scores are kept in an LRU so repeated questions skip the model.
+    """
+
+    _model = None
+    _model_lock = threading.Lock()
+
+    def __init__(self, model_name: str = RERANK_MODEL, cache_size: int = RERANK_CACHE_SIZE):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_model(self):
+        if RerankClient._model is None:
+            with RerankClient._model_lock:
+                if RerankClient._model is None:
+                    from fastembed.rerank.cross_encoder import TextCrossEncoder
+
+                    logger.info(f"Loading reranker model {self.model_name}...")
+                    RerankClient._model = TextCrossEncoder(
+                        model_name=self.model_name, threads=RERANK_THREADS
+                    )
+                    logger.info("Reranker loaded!")
+        return RerankClient._model
+
+    def _key(self, query: str, text: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.model_name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(query.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        return h.digest()
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """Relevance score per text (higher is better)."""
+        keys = [self._key(query, t) for t in texts]
+        scores = np.empty(len(texts), dtype=np.float32)
+        missing = []
+
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            computed = list(
+                self._load_model().rerank(query, [texts[i] for i in missing], batch_size=len(missing))
+            )
+            with self._cache_lock:
+                for i, value in zip(missing, computed):
+                    scores[i] = value
+                    self._cache[keys[i]] = float(value)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return scores
+
+    def rerank(self, query: str, hits: Sequence, top_k: int = RERANK_TOP_K) -> List[ScoredPoint]:
+        """The `top_k` hits by cross-encoder score; hit scores are replaced by the reranker's."""
+        hits = [h for h in hits if isinstance(h.payload, dict) and h.payload.get("text")]
+        if not hits:
+            return []
+
+        with stage_timer("rerank"):
+            scores = self.score(query, [h.payload["text"] for h in hits])
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [
+            ScoredPoint(id=hits[i].id, version=hits[i].version, score=float(scores[i]), payload=hits[i].payload)
+            for i in order
+        ]
+
+    async def arerank(self, query: str, hits: Sequence, top_k: int = RERANK_TOP_K) -> List[ScoredPoint]:
+        return await run_in_threadpool(self.rerank, query, hits, top_k)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "cached_pairs": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_reranker: Optional[RerankClient] = None
+_reranker_lock = threading.Lock()
+
+
+def get_rerank_client() -> Optional[RerankClient]:
+    """Process-wide reranker, or None when RERANK_ENABLED is off."""
+    global _reranker
+    if not RERANK_ENABLED:
+        return None
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = RerankClient()
+    return _reranker
@@ -1,25 +1,130 @@
 import os
 import uuid
-from typing import List, Optional
+import hashlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Union
 
-from qdrant_client import QdrantClient
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.models import (
-    Distance,
-    VectorParams,
-    PointStruct,
     Filter,
+    FieldCondition,
+    HasIdCondition,
+    MatchValue,
     PayloadSchemaType,   # 🔥 ADD
+    PointIdsList,
+    SetPayload,
+    SetPayloadOperation,
 )
 
+from app.clients.bulk_writer import BulkWriter, UpsertReport
+from app.clients.collection_profile import (
+    CollectionProfile,
+    create_collection_kwargs,
+    describe_collection,
+    get_profile,
+    search_params,
+    update_collection_kwargs,
+)
+
+# Keep-alive HTTP connections held open to Qdrant per process
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "20"))
+
+
+# Timeout (seconds) for chat-path searches; bulk writes keep the longer client default
+QDRANT_SEARCH_TIMEOUT = int(os.getenv("QDRANT_SEARCH_TIMEOUT", "10"))
+
+
+# Keyword payload indexes so filtered HNSW search by document, tag or tenant stays fast
+INDEXED_PAYLOAD_FIELDS = ("document_id", "tags", "tenant_id")
+
+
+# Namespace for content-addressed point ids (uuid5 of document, chunk hash and occurrence)
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2b1e-8d4a-5b7e-9c3f-2a1d0e4b5c6d")
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def point_id(document_id, text_hash: str, occurrence: int = 0) -> str:
+    """
+    Deterministic id: re-indexing the same chunk overwrites its point instead of
+    duplicating it. The position isn't part of it, so inserting a paragraph
+    doesn't change the ids of the chunks after it; `occurrence` tells repeated
+    chunks of one document apart.
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{document_id}:{text_hash}:{occurrence}"))
+
+
+class ChunkIds:
+    """Point ids for one document's chunks, fed in document order."""
+
+    def __init__(self, document_id):
+        self.document_id = document_id
+        self._seen: Counter = Counter()
+
+    def next(self, text_hash: str) -> str:
+        occurrence = self._seen[text_hash]
+        self._seen[text_hash] += 1
+        return point_id(self.document_id, text_hash, occurrence)
+
+
+def _payload_point_ids(payloads: List[dict]) -> List[str]:
+    # Content-addressed ids when the payload identifies the chunk, random otherwise
+    documents: Dict[str, ChunkIds] = {}
+    ids = []
+    for payload in payloads:
+        if "document_id" in payload and "text" in payload:
+            chunk_ids = documents.setdefault(str(payload["document_id"]), ChunkIds(payload["document_id"]))
+            ids.append(chunk_ids.next(payload.get("chunk_hash") or chunk_hash(payload["text"])))
+        else:
+            ids.append(str(uuid.uuid4()))
+    return ids
+
+
+def _qdrant_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=QDRANT_POOL_SIZE,
+        max_keepalive_connections=QDRANT_POOL_SIZE,
+    )
+
+
+def create_qdrant_client() -> QdrantClient:
+    return QdrantClient(
+        url=os.getenv("QDRANT_URL"),
+        api_key=os.getenv("QDRANT_API_KEY"),
+        timeout=60,
+        limits=_qdrant_limits(),
+    )
+
+
+def create_async_qdrant_client() -> AsyncQdrantClient:
+    return AsyncQdrantClient(
+        url=os.getenv("QDRANT_URL"),
+        api_key=os.getenv("QDRANT_API_KEY"),
+        timeout=60,
+        limits=_qdrant_limits(),
+    )
+
+
 class VectorStore:
-    def __init__(self, collection_name: str = "documents"):
+    def __init__(
+        self,
+        collection_name: str = "documents",
+        client: Optional[QdrantClient] = None,
+        async_client: Optional[AsyncQdrantClient] = None,
+        profile: Optional[CollectionProfile] = None,
+    ):
         self.collection_name = collection_name
 
-        self.client = QdrantClient(
-            url=os.getenv("QDRANT_URL"),
-            api_key=os.getenv("QDRANT_API_KEY"),
-            timeout=60,
-        )
+        # Creation settings for a new collection and search parameters for every query (COLLECTION_PROFILE)
+        self.profile = profile or get_profile()
+
+        # Pass shared clients to reuse their connection pools across stores
+        self.client = client or create_qdrant_client()
+        self._async_client = async_client
 
         self._init_collection()
 
@@ -31,46 +136,154 @@ class VectorStore:
             if self.collection_name not in collection_names:
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(
-                        size=384,
-                        distance=Distance.COSINE,
-                    ),
+                    **create_collection_kwargs(self.profile),
                 )
 
-            # 🔥 ADD PAYLOAD INDEX FOR document_id (CRITICAL FIX)
-            try:
-                self.client.create_payload_index(
-                    collection_name=self.collection_name,
-                    field_name="document_id",
-                    field_schema=PayloadSchemaType.KEYWORD,
-                )
-            except Exception as e:
-                # Index may already exist — safe to ignore
-                print(f"Payload index creation skipped: {e}")
+            # 🔥 ADD PAYLOAD INDEXES FOR FILTERED SEARCH (CRITICAL FIX)
+            for field_name in INDEXED_PAYLOAD_FIELDS:
+                try:
+                    self.client.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=field_name,
+                        field_schema=PayloadSchemaType.KEYWORD,
+                    )
+                except Exception as e:
+                    # Index may already exist — safe to ignore
+                    print(f"Payload index creation skipped for {field_name}: {e}")
 
         except Exception as e:
             print(f"Collection init error: {e}")
 
-    def add_embeddings(self, embeddings: List[List[float]], payloads: List[dict]):
-        points = [
-            PointStruct(
-                id=str(uuid.uuid4()),
-                vector=emb,
-                payload=payload,
+    def describe(self) -> dict:
+        return describe_collection(self.client.get_collection(self.collection_name))
+
+    def apply_profile(self, profile: CollectionProfile) -> dict:
+        """
+        Move the existing collection to `profile` in place. Searches and writes
+        keep working while Qdrant rebuilds segments in the background; the
+        collection reports status "yellow" until optimization finishes.
+        """
+        current = self.describe()
+        if current["datatype"] != profile.datatype:
+            raise ValueError(
+                f"Collection stores {current['datatype']} vectors; changing the datatype to "
+                f"{profile.datatype} needs a new collection and a re-ingest"
+            )
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            **update_collection_kwargs(profile),
+        )
+        self.profile = profile
+        return self.describe()
+
+    def bulk_writer(self, **kwargs) -> BulkWriter:
+        """Batched, parallel, retrying writer for this collection; close() it to flush."""
+        return BulkWriter(self.client, self.collection_name, **kwargs)
+
+    def add_embeddings(
+        self,
+        embeddings: Union[np.ndarray, List[List[float]]],
+        payloads: List[dict],
+        ids: Optional[List[str]] = None,
+    ) -> UpsertReport:
+        if ids is None:
+            ids = _payload_point_ids(payloads)
+
+        with self.bulk_writer() as writer:
+            writer.submit(embeddings, payloads, ids)
+        return writer.report
+
+    def get_document_point_ids(self, document_id) -> Set[str]:
+        """Ids of every point stored for a document."""
+        return set(self.get_document_chunk_indexes(document_id))
+
+    def get_document_chunk_indexes(self, document_id) -> Dict[str, Optional[int]]:
+        """Point id → stored chunk_index for every point of a document."""
+        indexes = {}
+        offset = None
+        document_filter = Filter(
+            must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))]
+        )
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=document_filter,
+                limit=1000,
+                offset=offset,
+                with_payload=["chunk_index"],
+                with_vectors=False,
             )
-            for emb, payload in zip(embeddings, payloads)
+            indexes.update((str(p.id), (p.payload or {}).get("chunk_index")) for p in points)
+            if offset is None:
+                return indexes
+
+    def set_chunk_indexes(self, indexes: Dict[str, int], batch_size: int = 1000):
+        """Rewrite chunk_index on points whose position in the document moved."""
+        operations = [
+            SetPayloadOperation(set_payload=SetPayload(payload={"chunk_index": index}, points=[pid]))
+            for pid, index in indexes.items()
         ]
+        for start in range(0, len(operations), batch_size):
+            self.client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=operations[start:start + batch_size],
+                wait=True,
+            )
+
+    def delete_points(self, ids: Iterable[str], batch_size: int = 1000) -> int:
+        ids = list(ids)
+        for start in range(0, len(ids), batch_size):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=ids[start:start + batch_size]),
+                wait=True,
+            )
+        return len(ids)
+
+    def set_document_payload(self, document_id, payload: dict):
+        """Overwrite the given payload keys on every point of a document."""
+        self.client.set_payload(
+            collection_name=self.collection_name,
+            payload=payload,
+            points=Filter(
+                must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))]
+            ),
+            wait=True,
+        )
+
+    def count(self) -> int:
+        return self.client.count(collection_name=self.collection_name, exact=False).count
 
-        self.client.upsert(
+    def retrieve(self, ids: List[str], query_filter: Optional[Filter] = None):
+        """Points (with payloads, without vectors) for the given ids, optionally only those matching a filter."""
+        if not ids:
+            return []
+        if query_filter is not None:
+            points, _ = self.client.scroll(**self._filtered_ids_request(ids, query_filter))
+            return points
+        return self.client.retrieve(
             collection_name=self.collection_name,
-            points=points,
+            ids=list(ids),
+            with_payload=True,
+            with_vectors=False,
         )
 
+    def _filtered_ids_request(self, ids: List[str], query_filter: Filter) -> dict:
+        return {
+            "collection_name": self.collection_name,
+            "scroll_filter": Filter(must=[HasIdCondition(has_id=list(ids)), query_filter]),
+            "limit": len(ids),
+            "with_payload": True,
+            "with_vectors": False,
+        }
+
     def search(
         self,
-        query_vector: List[float],
+        query_vector: Union[np.ndarray, List[float]],
         limit: int = 5,
         query_filter: Optional[Filter] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None,
     ):
         try:
             search_result = self.client.query_points(
@@ -79,6 +292,53 @@ class VectorStore:
                 limit=limit,
                 with_payload=True,
                 query_filter=query_filter,
+                search_params=search_params(self.profile, hnsw_ef, exact),
+            )
+            return search_result.points
+        except Exception as e:
+            print(f"Search error: {e}")
+            return []
+
+    @property
+    def async_client(self) -> AsyncQdrantClient:
+        if self._async_client is None:
+            self._async_client = create_async_qdrant_client()
+        return self._async_client
+
+    async def aretrieve(self, ids: List[str], query_filter: Optional[Filter] = None):
+        if not ids:
+            return []
+        if query_filter is not None:
+            points, _ = await self.async_client.scroll(
+                **self._filtered_ids_request(ids, query_filter),
+                timeout=QDRANT_SEARCH_TIMEOUT,
+            )
+            return points
+        return await self.async_client.retrieve(
+            collection_name=self.collection_name,
+            ids=list(ids),
+            with_payload=True,
+            with_vectors=False,
+            timeout=QDRANT_SEARCH_TIMEOUT,
+        )
+
+    async def asearch(
+        self,
+        query_vector: Union[np.ndarray, List[float]],
+        limit: int = 5,
+        query_filter: Optional[Filter] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None,
+    ):
+        try:
+            search_result = await self.async_client.query_points(
+                collection_name=self.collection_name,
+                query=query_vector,
+                limit=limit,
+                with_payload=True,
+                query_filter=query_filter,
+                search_params=search_params(self.profile, hnsw_ef, exact),
+                timeout=QDRANT_SEARCH_TIMEOUT,
             )
             return search_result.points
         except Exception as e:
@@ -16,6 +16,7 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_hex(32)  # Auto-generate if not set
     
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    ALGORITHM: str = "HS256"
     GROQ_API_KEY: str  # Required for chat
     
     # Optional for embeddings (you're using FastEmbed now, so not needed)
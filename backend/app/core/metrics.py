@@ -0,0 +1,162 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, start_http_server
+from prometheus_client.core import REGISTRY, CounterMetricFamily
+
+from app.core.tracing import add_span
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+# Port for a standalone /metrics server in processes without the API (the ingest worker); 0 disables it
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+# Seconds; spans 1 ms cache hits to multi-second Groq calls and large extractions
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# ==============================
+# METRICS
+# ==============================
+STAGE_LATENCY = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in one pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+EMBED_BATCH_TEXTS = Histogram(
+    "rag_embed_batch_size",
+    "Texts per embedding call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+PROMPT_TOKENS = Histogram(
+    "rag_prompt_tokens",
+    "Estimated tokens per chat prompt",
+    buckets=(64, 128, 256, 512, 1024, 1536, 2048, 4096, 8192),
+)
+
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total",
+    "LLM tokens as reported by Groq's usage block",
+    ["kind"],   # prompt | completion
+)
+
+# Calls that ended without a usage block (stream cut short, API error) are estimated with
+# count_tokens; kept apart so billing-grade counts are never mixed with guesses
+LLM_TOKENS_ESTIMATED = Counter(
+    "rag_llm_tokens_estimated_total",
+    "LLM tokens estimated locally for calls Groq reported no usage for",
+    ["kind"],   # prompt | completion
+)
+
+LLM_FIRST_TOKEN = Histogram(
+    "rag_llm_first_token_seconds",
+    "Time from a streaming LLM request to its first token",
+    buckets=LATENCY_BUCKETS,
+)
+
+INGESTED_CHUNKS = Counter("rag_ingested_chunks_total", "Chunks embedded and written by ingest jobs")
+
+EMBED_QUEUE_DEPTH = Gauge("rag_embed_queue_depth", "Query embeddings waiting for the batcher")
+INGEST_QUEUE_DEPTH = Gauge("rag_ingest_jobs_queued", "Ingest jobs waiting for a worker")
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage in the histogram and on the current request's trace (Server-Timing)."""
+    STAGE_LATENCY.labels(stage).observe(seconds)
+    add_span(stage, seconds)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+class TimedIterator:
+    """
+    Iterator wrapper that accumulates the time spent producing items in
+    `elapsed`, for lazy stages such as extraction and chunking. A wrapped
+    iterator feeding another one is counted in both; subtract to separate them.
+    """
+
+    def __init__(self, iterable: Iterable):
+        self._it = iter(iterable)
+        self.elapsed = 0.0
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._it)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+class _CacheCollector:
+    """Hit and miss counts read from each cache's own counters at scrape time."""
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        from app.clients.rerank_client import get_rerank_client
+        from app.services.embedding_cache_service import get_embedding_cache
+        from app.services.semantic_cache_service import get_semantic_cache
+
+        hits = CounterMetricFamily("rag_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("rag_cache_misses", "Cache misses", labels=["cache"])
+        caches = {
+            "semantic": get_semantic_cache(),
+            "embedding": get_embedding_cache(),
+            "rerank": get_rerank_client(),
+        }
+        for name, cache in caches.items():
+            if cache is not None:
+                hits.add_metric([name], cache.hits)
+                misses.add_metric([name], cache.misses)
+        yield hits
+        yield misses
+
+
+def _embed_queue_depth() -> float:
+    from app.clients.embed_client import get_embed_batcher
+
+    return get_embed_batcher().queue_depth
+
+
+def _ingest_queue_depth() -> float:
+    from app.services import job_service
+
+    try:
+        return job_service.count_jobs("queued")
+    except Exception:
+        return float("nan")
+
+
+EMBED_QUEUE_DEPTH.set_function(_embed_queue_depth)
+INGEST_QUEUE_DEPTH.set_function(_ingest_queue_depth)
+REGISTRY.register(_CacheCollector())
+
+
+def render_metrics():
+    """Prometheus text exposition of every metric in this process, and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int = WORKER_METRICS_PORT):
+    if port:
+        start_http_server(port)
+        logger.info(f"Metrics served on :{port}/metrics")
@@ -1,2 +1,256 @@
-RATE_LIMIT_REQUESTS = 20   # requests
-RATE_LIMIT_WINDOW = 60    # seconds
+import os
+import json
+import time
+import ipaddress
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "20"))   # requests
+RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "60"))       # seconds
+
+
+class RouteLimit(NamedTuple):
+    per_minute: float   # sustained token refill rate
+    burst: float        # bucket capacity
+
+
+# ==============================
+# MIDDLEWARE CONFIG
+# ==============================
+# Path prefix → limit; the longest matching prefix wins. A prefix may be restricted to one
+# method ("PUT /documents"), which wins over a plain prefix of the same length. Override with
+# RATE_LIMITS, e.g. RATE_LIMITS='{"/chat": {"per_minute": 120, "burst": 30}}'
+DEFAULT_ROUTE_LIMITS: Dict[str, RouteLimit] = {
+    "/chat": RouteLimit(per_minute=60, burst=20),
+    "/documents/upload": RouteLimit(per_minute=30, burst=60),
+    # Re-indexing a document uploads a new version of it
+    "PUT /documents": RouteLimit(per_minute=30, burst=60),
+}
+
+# Routes whose requests carry a document body and are charged by size
+UPLOAD_ROUTES = ("/documents/upload", "PUT /documents")
+
+# Per-caller multipliers keyed by API key, e.g. RATE_LIMIT_TIERS='{"team-a-key": 5}'.
+# Only keys listed here identify a caller; any other X-API-Key is ignored.
+RATE_LIMIT_TIERS: Dict[str, float] = json.loads(os.getenv("RATE_LIMIT_TIERS", "{}"))
+
+# Uploads cost 1 token plus 1 per this many bytes, so bulk ingest drains its bucket faster
+UPLOAD_COST_BYTES = int(os.getenv("UPLOAD_COST_BYTES", str(1024 * 1024)))
+
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+# X-Forwarded-For is honoured only from these proxy networks. The default covers loopback and
+# private ranges, which is where Railway's edge, nginx and docker networks connect from; public
+# clients can't come from them. Set to "" when the API is exposed directly on a private network.
+DEFAULT_TRUSTED_PROXIES = "127.0.0.0/8,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,100.64.0.0/10,::1/128,fc00::/7"
+RATE_LIMIT_TRUSTED_PROXIES = [
+    ipaddress.ip_network(cidr.strip(), strict=False)
+    for cidr in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", DEFAULT_TRUSTED_PROXIES).split(",")
+    if cidr.strip()
+]
+
+# Trust X-Forwarded-For from any peer; only for platforms whose proxy addresses aren't known (and that strip
+# client-supplied XFF). Off by default: otherwise any client can pick a fresh bucket by sending a new header.
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+
+def _load_route_limits() -> Dict[str, RouteLimit]:
+    limits = dict(DEFAULT_ROUTE_LIMITS)
+    for prefix, spec in json.loads(os.getenv("RATE_LIMITS", "{}")).items():
+        limits[prefix] = RouteLimit(float(spec["per_minute"]), float(spec["burst"]))
+    return limits
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by (caller, route). Each check is O(1): refill from the
+    elapsed time, then try to take `cost` tokens. Idle buckets are evicted LRU
+    once `max_buckets` is reached (an evicted bucket simply starts full again).
+    """
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        # key → [tokens, last_refill_timestamp]
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: Tuple[str, str], limit: RouteLimit, cost: float = 1.0) -> Tuple[bool, float, float]:
+        """Returns (allowed, tokens_remaining, retry_after_seconds)."""
+        now = time.monotonic()
+        rate = limit.per_minute / 60
+        # A single request never costs more than a full bucket, or it could never pass
+        cost = min(cost, limit.burst)
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [limit.burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(limit.burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, bucket[0], 0.0
+
+            retry_after = (cost - bucket[0]) / rate if rate > 0 else 60.0
+            return False, bucket[0], retry_after
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _is_trusted_proxy(ip: str) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def _token_subject(token: str) -> Optional[str]:
+    # Imported lazily: settings require the full app environment, the limiter doesn't
+    from app.core.security import decode_access_token
+
+    claims = decode_access_token(token)
+    return claims.get("sub") if claims else None
+
+
+def client_ip(scope) -> str:
+    """
+    Peer address, or the nearest untrusted X-Forwarded-For hop when the peer is
+    a trusted proxy. Hops are read right to left: only the entries our own
+    proxies appended can be believed, anything further left is client-supplied.
+    """
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if not (RATE_LIMIT_TRUST_FORWARDED or _is_trusted_proxy(peer)):
+        return peer
+
+    forwarded = _header(scope, b"x-forwarded-for")
+    if not forwarded:
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    if RATE_LIMIT_TRUST_FORWARDED:
+        return hops[0] if hops else peer
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def identify_caller(scope) -> Tuple[str, float]:
+    """
+    Caller identity and tier multiplier: a configured API key, then the subject
+    of a valid access token, then the client IP. Unknown keys and unverifiable
+    tokens are ignored, so rotating them doesn't buy a fresh bucket.
+    """
+    api_key = _header(scope, b"x-api-key")
+    if api_key and api_key in RATE_LIMIT_TIERS:
+        return f"key:{api_key}", float(RATE_LIMIT_TIERS[api_key])
+
+    auth = _header(scope, b"authorization")
+    if auth and auth.lower().startswith("bearer "):
+        subject = _token_subject(auth[7:].strip())
+        if subject:
+            return f"user:{subject}", 1.0
+
+    return f"ip:{client_ip(scope)}", 1.0
+
+
+def _split_route(route: str) -> Tuple[Optional[str], str]:
+    # "PUT /documents" → ("PUT", "/documents"); "/chat" → (None, "/chat")
+    method, _, prefix = route.rpartition(" ")
+    return (method.upper() or None), prefix
+
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing per-route, per-caller token buckets."""
+
+    def __init__(self, app, limits: Optional[Dict[str, RouteLimit]] = None, limiter: Optional[TokenBucketLimiter] = None):
+        self.app = app
+        self.limits = limits or _load_route_limits()
+        # (route, method, path prefix), longest prefix first so "/documents/upload" wins over
+        # "/documents", and method-specific routes before plain ones of the same length
+        routes = [(route, *_split_route(route)) for route in self.limits]
+        self._routes = sorted(routes, key=lambda r: (len(r[2]), r[1] is not None), reverse=True)
+        self.limiter = limiter or TokenBucketLimiter()
+
+    def _match(self, method: str, path: str) -> Optional[str]:
+        for route, route_method, prefix in self._routes:
+            if route_method is not None and route_method != method:
+                continue
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return route
+        return None
+
+    @staticmethod
+    def _cost(scope, route: str) -> float:
+        if route in UPLOAD_ROUTES:
+            length = _header(scope, b"content-length")
+            if length and length.isdigit():
+                return 1.0 + int(length) / UPLOAD_COST_BYTES
+            # Chunked bodies can't be priced up front; see __call__
+            return None
+        return 1.0
+
+    @staticmethod
+    async def _reject(send, status: int, detail: str, headers=()):
+        body = json.dumps({"detail": detail}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    *headers,
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._match(scope["method"], scope["path"])
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        cost = self._cost(scope, route)
+        if cost is None:
+            # Otherwise a chunked upload of any size would pay the minimum cost
+            await self._reject(send, 411, "Uploads must send a Content-Length header.")
+            return
+
+        caller, multiplier = identify_caller(scope)
+        base = self.limits[route]
+        limit = RouteLimit(base.per_minute * multiplier, base.burst * multiplier)
+        allowed, remaining, retry_after = self.limiter.consume((caller, route), limit, cost)
+
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        await self._reject(
+            send,
+            429,
+            "Rate limit exceeded. Please try again later.",
+            [
+                (b"retry-after", str(max(1, int(retry_after + 0.999))).encode()),
+                (b"x-ratelimit-limit", str(int(limit.burst)).encode()),
+                (b"x-ratelimit-remaining", str(int(remaining)).encode()),
+            ],
+        )
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
-from jose import jwt
+from typing import Optional
+from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
@@ -23,3 +24,11 @@ def create_access_token(data: dict):
     return jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
+
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """Claims of a valid, unexpired token issued by create_access_token; None otherwise."""
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
@@ -0,0 +1,44 @@
+import re
+
+# Word runs and single punctuation marks, roughly how BPE tokenizers split text
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+# Llama-3/GPT-4 class vocabularies hold most common English words whole (with their
+# leading space); rarer, longer words split into pieces of about five characters
+WHOLE_WORD_CHARS = 10
+CHARS_PER_EXTRA_TOKEN = 5
+
+# Digits are split into groups of at most three
+DIGITS_PER_TOKEN = 3
+
+# Text outside the vocabularies' English core falls back to byte-level pieces
+NON_ASCII_CHARS_PER_TOKEN = 2
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece.isdigit():
+        return -(-len(piece) // DIGITS_PER_TOKEN)
+    if not piece.isascii():
+        return max(1, -(-len(piece) // NON_ASCII_CHARS_PER_TOKEN))
+    return 1 + -(-max(0, len(piece) - WHOLE_WORD_CHARS) // CHARS_PER_EXTRA_TOKEN)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Heuristic estimate of LLM tokens in `text`, without loading a vocabulary:
+    one token per common word or punctuation mark, extra ones for long words,
+    numbers and non-English text. English prose comes out at about 1.3 tokens
+    per word like the real tokenizers, but single texts can be off by 10-20%
+    (more for code), so leave headroom when budgeting prompts.
+    """
+    return sum(_piece_tokens(piece) for piece in _PIECES.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text`, cut at a piece boundary, with at most `max_tokens` tokens."""
+    tokens = 0
+    for match in _PIECES.finditer(text):
+        tokens += _piece_tokens(match.group())
+        if tokens > max_tokens:
+            return text[:match.start()].rstrip()
+    return text
@@ -0,0 +1,288 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+
+# Requests slower than this (ms) are logged with their span breakdown at WARNING
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "2000"))
+
+# Share of requests sampled for stack profiling (0 disables profiling)
+TRACE_PROFILE_SAMPLE_RATE = float(os.getenv("TRACE_PROFILE_SAMPLE_RATE", "0"))
+# A sampled request's profile is kept only if the request took at least this long (ms)
+TRACE_PROFILE_THRESHOLD_MS = float(os.getenv("TRACE_PROFILE_THRESHOLD_MS", "1000"))
+TRACE_PROFILE_INTERVAL_MS = float(os.getenv("TRACE_PROFILE_INTERVAL_MS", "5"))
+TRACE_PROFILE_DIR = os.getenv("TRACE_PROFILE_DIR", "./profiles")
+# Oldest profiles are deleted beyond this many
+TRACE_PROFILE_MAX = int(os.getenv("TRACE_PROFILE_MAX", "50"))
+
+# Incoming X-Request-ID values are reused only if they look like ids
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+# Profiles are stored under server-generated ids, never under the caller's request id
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+# ==============================
+# TRACE CONTEXT
+# ==============================
+class Trace:
+    """Per-request span totals, keyed by stage; repeated stages (two searches) add up."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.profile_id = uuid.uuid4().hex
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        # Stages may finish on threadpool threads, concurrently with the event loop
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def span_ms(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(seconds * 1000, 2) for name, seconds in self.spans.items()}
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={ms}" for name, ms in self.span_ms().items()]
+        parts.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(parts)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+def add_span(name: str, seconds: float):
+    """Record a stage on the current request's trace; a no-op outside a request (ingest worker)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+# ==============================
+# PROFILING
+# ==============================
+class StackSampler:
+    """
+    Samples every thread's Python stack at a fixed interval into folded-stack
+    counts (the flamegraph.pl / speedscope input format). Unlike cProfile it
+    sees the event loop and threadpool threads together, so a profile shows
+    everything the process did while the request ran, including other
+    requests' work.
+    """
+
+    def __init__(self, interval_ms: float = TRACE_PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="trace-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+
+class ProfileStore:
+    """
+    Kept profiles on disk: `<profile_id>.folded` stacks plus `<profile_id>.json`
+    metadata. The request id a caller sent is only recorded in the metadata.
+    """
+
+    def __init__(self, directory: str = TRACE_PROFILE_DIR, max_profiles: int = TRACE_PROFILE_MAX):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._active = threading.Lock()
+
+    def try_start(self) -> Optional[StackSampler]:
+        # One profile at a time: samplers would otherwise multiply overhead under load
+        if not self._active.acquire(blocking=False):
+            return None
+        sampler = StackSampler()
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: StackSampler) -> Counter:
+        try:
+            return sampler.stop()
+        finally:
+            self._active.release()
+
+    def path(self, profile_id: str, ext: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def save(self, trace: Trace, counts: Counter, method: str, path: str, status: int):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path(trace.profile_id, "folded"), "w") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        meta = {
+            "profile_id": trace.profile_id,
+            "request_id": trace.request_id,
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round(trace.elapsed_ms(), 2),
+            "spans_ms": trace.span_ms(),
+            "samples": sum(counts.values()),
+            "interval_ms": TRACE_PROFILE_INTERVAL_MS,
+            "captured_at": time.time(),
+        }
+        with open(self.path(trace.profile_id, "json"), "w") as f:
+            json.dump(meta, f)
+        self._prune()
+
+    def _prune(self):
+        metas = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")),
+            key=os.path.getmtime,
+        )
+        for meta_path in metas[:-self.max_profiles]:
+            for ext in (".json", ".folded"):
+                try:
+                    os.unlink(meta_path[:-len(".json")] + ext)
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(profiles, key=lambda p: p["captured_at"], reverse=True)
+
+
+_profile_store = ProfileStore()
+
+
+def get_profile_store() -> ProfileStore:
+    return _profile_store
+
+
+# ==============================
+# MIDDLEWARE
+# ==============================
+def _request_id(scope) -> str:
+    for name, value in scope.get("headers", []):
+        if name == b"x-request-id":
+            candidate = value.decode("latin-1")
+            if _REQUEST_ID.match(candidate):
+                return candidate
+    return uuid.uuid4().hex
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that gives each request an id (X-Request-ID, reused from
+    the caller when valid), collects the stage timings recorded while it runs,
+    and returns them in a Server-Timing header. Streaming responses send
+    headers before their later stages finish, so their header only covers
+    the stages before the first byte; the slow-request log has the full
+    breakdown. A TRACE_PROFILE_SAMPLE_RATE share of requests is stack-sampled,
+    and the profile is kept if the request exceeds TRACE_PROFILE_THRESHOLD_MS.
+    """
+
+    def __init__(self, app, profile_store: Optional[ProfileStore] = None):
+        self.app = app
+        self.profiles = profile_store or get_profile_store()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(_request_id(scope))
+        token = _current_trace.set(trace)
+        sampler = None
+        if TRACE_PROFILE_SAMPLE_RATE > 0 and random.random() < TRACE_PROFILE_SAMPLE_RATE:
+            sampler = self.profiles.try_start()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", trace.request_id.encode("latin-1")),
+                    (b"server-timing", trace.server_timing().encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            elapsed = trace.elapsed_ms()
+            if sampler is not None:
+                counts = await run_in_threadpool(self.profiles.finish, sampler)
+                if elapsed >= TRACE_PROFILE_THRESHOLD_MS and counts:
+                    try:
+                        await run_in_threadpool(
+                            self.profiles.save, trace, counts, scope["method"], scope["path"], status
+                        )
+                        logger.info(
+                            f"Saved profile {trace.profile_id} for request {trace.request_id} ({elapsed:.0f} ms)"
+                        )
+                    except OSError as e:
+                        logger.warning(f"Could not save profile for request {trace.request_id}: {e}")
+
+            if elapsed >= TRACE_SLOW_MS:
+                logger.warning(
+                    f"Slow request {trace.request_id} {scope['method']} {scope['path']} -> {status} "
+                    f"in {elapsed:.0f} ms; spans (ms): {trace.span_ms()}"
+                )
@@ -1,17 +1,77 @@
 import os
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.clients.embed_client import EmbedClient
+from app.api.deps import require_admin
+from app.core.metrics import render_metrics
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.tracing import TracingMiddleware
+from app.clients.embed_client import get_embed_batcher
+from app.clients.registry import KNOWLEDGE_COLLECTION, VECTOR_BACKEND, aclose_registry, get_registry
+from app.clients.rerank_client import get_rerank_client
+from app.services.cache_service import close_cache_backend
+from app.services.extract_service import shutdown_extract_pool
+from app.services.semantic_cache_service import start_invalidation_watcher
+
+# ✅ Ingest worker: runs inside the API process unless a separate worker is deployed
+INGEST_WORKER_MODE = os.getenv("INGEST_WORKER_MODE", "inprocess")
+INGEST_WORKER_THREADS = int(os.getenv("INGEST_WORKER_THREADS", "1"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The local vector store keeps its slot state in memory; a separate worker process would corrupt it
+    if VECTOR_BACKEND == "local" and INGEST_WORKER_MODE != "inprocess":
+        raise RuntimeError("VECTOR_BACKEND=local requires INGEST_WORKER_MODE=inprocess (single-process store)")
+
+    # ✅ Shared clients: one pooled Qdrant connection, collection + index checked once
+    clients = get_registry()
+    clients.vector_store(KNOWLEDGE_COLLECTION)
+    app.state.clients = clients
+
+    # ✅ Preload embedding model on startup (prevents first-request delay)
+    print("Pre-loading embedding model on startup...")
+    clients.embed_client.warmup()
+    print("Embedding model pre-loaded successfully!")
+
+    reranker = get_rerank_client()
+    if reranker is not None:
+        reranker.score("warmup query", ["warmup passage"])
+        print("Reranker model pre-loaded successfully!")
+
+    if INGEST_WORKER_MODE == "inprocess":
+        from worker.main import start_worker_threads
+        app.state.ingest_worker_stop = start_worker_threads(INGEST_WORKER_THREADS)
+        print(f"In-process ingest worker started ({INGEST_WORKER_THREADS} thread(s))")
+    else:
+        # The external worker can't reach this process's semantic cache; invalidate from the queue
+        app.state.cache_invalidation_stop = start_invalidation_watcher()
+
+    yield
+
+    for name in ("ingest_worker_stop", "cache_invalidation_stop"):
+        stop_event = getattr(app.state, name, None)
+        if stop_event is not None:
+            stop_event.set()
+    shutdown_extract_pool()
+    await get_embed_batcher().aclose()
+    await aclose_registry()
+    close_cache_backend()
+
 
 app = FastAPI(
     title="Enterprise AI Knowledge System",
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+# ✅ Per-route, per-caller token-bucket rate limiting (added before CORS so 429s get CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # ✅ CORRECT CORS CONFIG (FIXES FAILED TO FETCH)
 app.add_middleware(
     CORSMiddleware,
@@ -19,32 +79,35 @@ app.add_middleware(
     allow_credentials=False,      # ❗ MUST be False with "*"
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
 
+# ✅ Request id + per-stage Server-Timing (outermost, so rate-limited and CORS responses carry them too)
+app.add_middleware(TracingMiddleware)
+
 # Root endpoint
 @app.get("/")
 def root():
     return {"message": "Enterprise AI Knowledge System API is running"}
 
-# Health check
-@app.get("/health")
-def health():
-    return {"status": "ok"}
-
-# ✅ Preload embedding model on startup (prevents first-request delay)
-@app.on_event("startup")
-async def preload_embedding_model():
-    print("Pre-loading embedding model on startup...")
-    embed_client = EmbedClient()
-    embed_client.embed(["warmup text to load model"])
-    print("Embedding model pre-loaded successfully!")
+# Prometheus scrape endpoint: stage latency histograms, queue depths, cache hits, token counts
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 # Routers
 from app.api.v1.documents import router as documents_router
 from app.api.v1.chat import router as chat_router
+from app.api.v1.admin_vectors import router as admin_vectors_router
+from app.api.v1.health import router as health_router
+from app.api.v1.admin_traces import router as admin_traces_router
 
 app.include_router(documents_router, prefix="/documents", tags=["documents"])
 app.include_router(chat_router, prefix="/chat", tags=["chat"])
+app.include_router(admin_vectors_router, dependencies=[Depends(require_admin)])
+app.include_router(admin_traces_router, dependencies=[Depends(require_admin)])
+app.include_router(health_router)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    kind = Column(String, nullable=False, default="ingest")
+    status = Column(String, nullable=False, default="queued", index=True)
+    stage = Column(String, nullable=False, default="queued")
+
+    document_id = Column(String, nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    collection_name = Column(String, nullable=False)
+
+    # Search scoping metadata copied onto every chunk payload; tags are a JSON list
+    tags = Column(Text, nullable=True)
+    tenant_id = Column(String, nullable=True)
+
+    chunks_stored = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    # Refreshed by the worker while it runs the job; a stale one means the worker died
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,54 +1,260 @@
+import os
 import time
 import json
-from typing import Any, Optional
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+# "memory" (per process) or "redis" (shared by every uvicorn worker)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "50000"))
+CACHE_SHARDS = int(os.getenv("CACHE_SHARDS", "16"))
+CACHE_SWEEP_INTERVAL = float(os.getenv("CACHE_SWEEP_INTERVAL", "30"))
+
+
+class CacheBackend:
+    """Key/value store with TTLs and windowed counters."""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: int):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def incr_window(self, key: str, window: int) -> int:
+        """Increment a counter that resets `window` seconds after its first hit; return the new count."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# ==============================
+# IN-MEMORY BACKEND
+# ==============================
+class _Shard:
+    def __init__(self, max_entries: int):
+        self.lock = threading.Lock()
+        # key → (value, expiry_timestamp), least recently used first
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.max_entries = max_entries
+        # Rate counters: key → (count, window_end). Never LRU-evicted, or a burst of cache
+        # writes would reset clients' windows; they go when their window ends
+        self.counters: Dict[str, tuple] = {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Size-bounded LRU/TTL store. Keys are spread over lock-striped shards so
+    concurrent requests rarely contend, and a background thread sweeps
+    expired entries instead of waiting for them to be read. Windowed counters
+    are kept apart from the LRU, so they only disappear when their window ends.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        shards: int = CACHE_SHARDS,
+        sweep_interval: float = CACHE_SWEEP_INTERVAL,
+    ):
+        per_shard = max(1, max_entries // shards)
+        self._shards: List[_Shard] = [_Shard(per_shard) for _ in range(shards)]
+        self._stop = threading.Event()
+        self._sweeper = None
+        if sweep_interval > 0:
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop,
+                args=(sweep_interval,),
+                name="cache-sweeper",
+                daemon=True,
+            )
+            self._sweeper.start()
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[zlib.crc32(key.encode("utf-8")) % len(self._shards)]
+
+    def get(self, key: str) -> Optional[Any]:
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                return None
+            value, expiry = entry
+            if time.time() > expiry:
+                del shard.entries[key]
+                return None
+            shard.entries.move_to_end(key)
+            return value
+
+    def _put(self, shard: _Shard, key: str, value: Any, expiry: float):
+        shard.entries[key] = (value, expiry)
+        shard.entries.move_to_end(key)
+        while len(shard.entries) > shard.max_entries:
+            shard.entries.popitem(last=False)
+
+    def set(self, key: str, value: Any, ttl: int):
+        shard = self._shard(key)
+        with shard.lock:
+            self._put(shard, key, value, time.time() + ttl)
+
+    def delete(self, key: str):
+        shard = self._shard(key)
+        with shard.lock:
+            shard.entries.pop(key, None)
+            shard.counters.pop(key, None)
+
+    def incr_window(self, key: str, window: int) -> int:
+        now = time.time()
+        shard = self._shard(key)
+        with shard.lock:
+            counter = shard.counters.get(key)
+            if counter is None or now > counter[1]:
+                count, expiry = 1, now + window
+            else:
+                count, expiry = counter[0] + 1, counter[1]
+            shard.counters[key] = (count, expiry)
+            return count
+
+    def sweep(self) -> int:
+        """Remove expired entries and ended counters from every shard; returns how many were dropped."""
+        removed = 0
+        for shard in self._shards:
+            now = time.time()
+            with shard.lock:
+                expired = [k for k, (_, expiry) in shard.entries.items() if now > expiry]
+                for k in expired:
+                    del shard.entries[k]
+                ended = [k for k, (_, expiry) in shard.counters.items() if now > expiry]
+                for k in ended:
+                    del shard.counters[k]
+            removed += len(expired) + len(ended)
+        return removed
+
+    def _sweep_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Cache sweep failed")
+
+    def __len__(self):
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def close(self):
+        self._stop.set()
+
+
+# ==============================
+# REDIS BACKEND
+# ==============================
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis-protocol backend so cached answers and rate counters are shared
+    across processes. Values are stored as JSON. Redis errors are logged and
+    treated as cache misses so the API keeps serving when Redis is down.
+    """
+
+    def __init__(self, url: str = REDIS_URL, client=None):
+        import redis
+
+        self._errors = redis.RedisError
+        self.client = client or redis.Redis.from_url(url, socket_timeout=1)
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self.client.get(key)
+        except self._errors as e:
+            logger.warning(f"Redis get failed: {e}")
+            return None
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: int):
+        try:
+            self.client.set(key, json.dumps(value), ex=ttl)
+        except self._errors as e:
+            logger.warning(f"Redis set failed: {e}")
+
+    def delete(self, key: str):
+        try:
+            self.client.delete(key)
+        except self._errors as e:
+            logger.warning(f"Redis delete failed: {e}")
+
+    def incr_window(self, key: str, window: int) -> int:
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            # Only the first hit of a window creates the key and sets its expiry
+            pipe.set(key, 0, ex=window, nx=True)
+            pipe.incr(key)
+            _, count = pipe.execute()
+            return int(count)
+        except self._errors as e:
+            logger.warning(f"Redis incr failed: {e}")
+            return 0
+
+    def close(self):
+        self.client.close()
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_cache_backend() -> CacheBackend:
+    """Process-wide backend selected by CACHE_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if CACHE_BACKEND == "redis":
+                    _backend = RedisCacheBackend()
+                else:
+                    _backend = MemoryCacheBackend()
+    return _backend
+
+
+def close_cache_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+            _backend = None
+
 
 class CacheService:
     """
-    Simple in-memory cache fallback for development when Redis is not available.
+    Cache facade used by the services. Every instance shares the process-wide
+    backend (in-memory by default, Redis with CACHE_BACKEND=redis).
     Supports: set, get, is_rate_limited, reset
     """
-    def __init__(self):
-        # Storage for cached values: key → (value, expiry_timestamp)
-        self.cache = {}
-        # Storage for rate limiting: key → (count, expiry_timestamp)
-        self.rate_limits = {}
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        # Not `backend or ...`: an empty MemoryCacheBackend is falsy (it defines __len__)
+        self.backend = backend if backend is not None else get_cache_backend()
 
     def get(self, key: str) -> Optional[Any]:
         """Get cached value if exists and not expired"""
-        entry = self.cache.get(key)
-        if entry is None:
-            return None
-        value, expiry = entry
-        if time.time() > expiry:
-            del self.cache[key]
-            return None
-        return value
+        return self.backend.get(key)
 
     def set(self, key: str, value: Any, ttl: int = 3600):
         """Set cached value with TTL in seconds"""
-        expiry = time.time() + ttl
-        self.cache[key] = (value, expiry)
+        self.backend.set(key, value, ttl)
 
     def is_rate_limited(self, key: str, limit: int = 10, window: int = 60) -> bool:
-        """Simple rate limiting"""
-        now = time.time()
-        entry = self.rate_limits.get(key)
-
-        if entry is None:
-            self.rate_limits[key] = (1, now + window)
-            return False
-
-        count, expiry = entry
-        if now > expiry:
-            self.rate_limits[key] = (1, now + window)
-            return False
-
-        if count >= limit:
-            return True
-
-        self.rate_limits[key] = (count + 1, expiry)
-        return False
+        """Fixed-window rate limiting"""
+        return self.backend.incr_window(key, window) > limit
 
     def reset(self, key: str):
         """Reset rate limit for key"""
-        self.rate_limits.pop(key, None)
\ No newline at end of file
+        self.backend.delete(key)
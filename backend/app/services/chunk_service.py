@@ -0,0 +1,221 @@
+import os
+import re
+import hashlib
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+# ==============================
+# CONFIG
+# ==============================
+# MiniLM (all-MiniLM-L6-v2) silently truncates input beyond 256 WordPiece tokens
+MODEL_MAX_TOKENS = 256
+
+# Target chunk size and the tail of each chunk repeated at the start of the next, in model tokens
+CHUNK_MAX_TOKENS = min(int(os.getenv("CHUNK_MAX_TOKENS", str(MODEL_MAX_TOKENS))), MODEL_MAX_TOKENS)
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# A paragraph that would overflow the current chunk starts a new one if the current chunk has this many tokens
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "96"))
+
+# [CLS] and [SEP] are added by the model to every input
+SPECIAL_TOKENS = 2
+
+_HEADING = re.compile(
+    r"^(#{1,6}\s+\S.*"                      # markdown heading
+    r"|(\d+\.)+\d*\s+[A-Z][^.!?]{0,80}"     # numbered section: "2.1 Scope"
+    r"|[A-Z][A-Z0-9 &/,:()-]{2,80})$"       # ALL CAPS line
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_WORDPIECE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    WordPiece token estimate without loading a vocabulary: common words are
+    one token, long or rare words split into roughly 6-character pieces,
+    punctuation is one token each. Used when the model's tokenizer is not loaded.
+    """
+    tokens = 0
+    for piece in _WORDPIECE.findall(text):
+        tokens += 1 + (len(piece) - 1) // 6
+    return tokens
+
+
+class _Unit(NamedTuple):
+    text: str
+    tokens: int
+    paragraph_start: bool
+    heading: bool = False
+
+
+def _is_heading(line: str) -> bool:
+    return len(line) <= 100 and bool(_HEADING.match(line)) and not line.endswith((".", ","))
+
+
+class Chunker:
+    """
+    Streaming, structure-aware chunker. Text is split into headings,
+    paragraphs and sentences, then sentences are packed into chunks of at most
+    `max_tokens` model tokens (special tokens included). A heading always
+    starts a new chunk, a paragraph that doesn't fit starts one once the
+    current chunk is reasonably full, and chunks cut mid-section repeat up to
+    `overlap_tokens` of trailing sentences. Each sentence is tokenized once, so
+    the cost is linear in the input.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        min_tokens: int = CHUNK_MIN_TOKENS,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        if max_tokens <= SPECIAL_TOKENS:
+            raise ValueError(f"max_tokens must be greater than {SPECIAL_TOKENS}")
+        # An overlap of half the chunk or more could make the chunker repeat itself instead of advancing
+        if not 0 <= overlap_tokens < (max_tokens - SPECIAL_TOKENS) // 2:
+            raise ValueError("overlap_tokens must be non-negative and less than half of max_tokens")
+
+        self.budget = max_tokens - SPECIAL_TOKENS
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min(min_tokens, self.budget)
+        self.count_tokens = count_tokens or estimate_tokens
+
+    # ---------- SPLITTING ----------
+    def _split_long(self, text: str) -> Iterator[_Unit]:
+        """Cut a sentence longer than the budget at line, then word boundaries."""
+        parts = text.splitlines() if "\n" in text else text.split()
+        joiner = "\n" if "\n" in text else " "
+        current: List[str] = []
+        used = 0
+        for part in parts:
+            part = part.strip()
+            if not part:
+                continue
+            tokens = self.count_tokens(part)
+            if tokens > self.budget:
+                # A single unbroken "word" (base64, long URLs): hard-cut by characters
+                step = max(1, len(part) * self.budget // tokens)
+                pieces = [part[i:i + step] for i in range(0, len(part), step)]
+            else:
+                pieces = [part]
+            for piece in pieces:
+                tokens = self.count_tokens(piece) if len(pieces) > 1 else tokens
+                if current and used + tokens > self.budget:
+                    yield _Unit(joiner.join(current), used, False)
+                    current, used = [], 0
+                current.append(piece)
+                used += tokens
+        if current:
+            yield _Unit(joiner.join(current), used, False)
+
+    def _units(self, blocks: Iterable[str]) -> Iterator[object]:
+        """Headings (as str) and sentence units, in document order."""
+        for block in blocks:
+            for paragraph in _PARAGRAPH_BREAK.split(block):
+                lines = [line.strip() for line in paragraph.splitlines() if line.strip()]
+                body: List[str] = []
+                for line in lines:
+                    if _is_heading(line):
+                        if body:
+                            yield from self._sentences("\n".join(body))
+                            body = []
+                        yield line
+                    else:
+                        body.append(line)
+                if body:
+                    yield from self._sentences("\n".join(body))
+
+    def _sentences(self, paragraph: str) -> Iterator[_Unit]:
+        first = True
+        for sentence in _SENTENCE_END.split(paragraph):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            tokens = self.count_tokens(sentence)
+            if tokens <= self.budget:
+                yield _Unit(sentence, tokens, first)
+            else:
+                for i, unit in enumerate(self._split_long(sentence)):
+                    yield unit._replace(paragraph_start=first and i == 0)
+            first = False
+
+    # ---------- PACKING ----------
+    def chunks(self, blocks: Iterable[str]) -> Iterator[str]:
+        """Chunks for one document, skipping exact duplicates."""
+        seen = set()
+        current: List[_Unit] = []
+        used = 0
+        fresh = 0   # units added since the last flush (overlap excluded)
+
+        def render(units: List[_Unit]) -> str:
+            text = ""
+            for unit in units:
+                if text:
+                    text += "\n\n" if unit.paragraph_start else " "
+                text += unit.text
+            return text.strip()
+
+        def emit(units: List[_Unit]) -> Iterator[str]:
+            chunk = render(units)
+            # Keep 16-byte digests instead of the chunks themselves
+            digest = hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+            if chunk and digest not in seen:
+                seen.add(digest)
+                yield chunk
+
+        def overlap_tail(units: List[_Unit]) -> List[_Unit]:
+            tail: List[_Unit] = []
+            size = 0
+            for unit in reversed(units):
+                if size + unit.tokens > self.overlap_tokens:
+                    break
+                tail.insert(0, unit._replace(paragraph_start=False))
+                size += unit.tokens
+            return tail
+
+        for unit in self._units(blocks):
+            if isinstance(unit, str):
+                # Heading: close the previous section without overlap; consecutive headings stay together
+                heading = _Unit(unit, min(self.count_tokens(unit), self.budget), True, heading=True)
+                if fresh:
+                    yield from emit(current)
+                    current = []
+                current = [u for u in current if u.heading]
+                used = sum(u.tokens for u in current)
+                if used + heading.tokens > self.budget:
+                    current, used = [], 0
+                current.append(heading)
+                used += heading.tokens
+                fresh = 0
+                continue
+
+            starts_new = used + unit.tokens > self.budget or (
+                # Break at a paragraph boundary rather than squeezing a fragment into a nearly full chunk
+                unit.paragraph_start and used >= self.min_tokens and self.budget - used < self.min_tokens
+            )
+            if starts_new and fresh:
+                yield from emit(current)
+                current = overlap_tail(current)
+                used = sum(u.tokens for u in current)
+                fresh = 0
+            if used + unit.tokens > self.budget:
+                # Only overlap or a heading is left and it doesn't fit with this unit
+                current, used = [], 0
+
+            current.append(unit)
+            used += unit.tokens
+            fresh += 1
+
+        # A trailing heading (or a document that is only headings) still yields a chunk
+        if fresh or (current and all(u.heading for u in current)):
+            yield from emit(current)
+
+
+def iter_chunks(blocks: Iterable[str], count_tokens: Optional[Callable[[str], int]] = None) -> Iterator[str]:
+    """Chunk streamed text blocks with the configured sizes."""
+    return Chunker(count_tokens=count_tokens).chunks(blocks)
+
+
+def chunk_text(text: str, count_tokens: Optional[Callable[[str], int]] = None) -> List[str]:
+    return list(iter_chunks([text], count_tokens))
@@ -0,0 +1,107 @@
+import os
+import re
+import logging
+from typing import List, NamedTuple, Sequence
+
+from app.core.tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+# Tokens of retrieved context allowed in one prompt (question and instructions come on top)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+
+# Chunks sharing at least this fraction of word shingles with a better chunk are dropped
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.7"))
+
+# A chunk that does not fit is cut to the remaining budget only if at least this many tokens are left
+CONTEXT_MIN_PARTIAL_TOKENS = int(os.getenv("CONTEXT_MIN_PARTIAL_TOKENS", "48"))
+
+SHINGLE_SIZE = 3
+
+_WORD = re.compile(r"\w+")
+
+
+class PackedContext(NamedTuple):
+    text: str
+    hits: list               # hits whose text made it into the context, best first
+    tokens: int              # context tokens used
+    dropped_duplicates: int
+    dropped_over_budget: int
+
+
+def _shingles(text: str) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _is_redundant(shingles: set, kept: List[set], threshold: float) -> bool:
+    for other in kept:
+        overlap = len(shingles & other)
+        # Overlap relative to the smaller chunk, so a chunk contained in a bigger one counts as a duplicate
+        if overlap and overlap / min(len(shingles), len(other)) >= threshold:
+            return True
+    return False
+
+
+def hit_text(hit) -> str:
+    payload = hit.payload if isinstance(hit.payload, dict) else {}
+    return (payload.get("text") or "").strip()
+
+
+def pack_context(
+    hits: Sequence,
+    budget: int = PROMPT_TOKEN_BUDGET,
+    dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+    separator: str = "\n\n",
+) -> PackedContext:
+    """
+    Greedily fill `budget` tokens with the highest-scoring chunks: near-duplicates
+    of an already chosen chunk are skipped, chunks that don't fit are skipped in
+    favour of smaller ones further down, and the last chunk may be truncated.
+    """
+    separator_tokens = count_tokens(separator)
+    ordered = sorted(hits, key=lambda h: h.score if h.score is not None else 0.0, reverse=True)
+
+    parts: List[str] = []
+    chosen = []
+    kept_shingles: List[set] = []
+    used = 0
+    duplicates = over_budget = 0
+
+    for hit in ordered:
+        text = hit_text(hit)
+        if not text:
+            continue
+
+        shingles = _shingles(text)
+        if _is_redundant(shingles, kept_shingles, dedup_threshold):
+            duplicates += 1
+            continue
+
+        cost = count_tokens(text) + (separator_tokens if parts else 0)
+        remaining = budget - used
+        if cost > remaining:
+            partial_budget = remaining - (separator_tokens if parts else 0)
+            if partial_budget < CONTEXT_MIN_PARTIAL_TOKENS:
+                over_budget += 1
+                continue
+            text = truncate_to_tokens(text, partial_budget)
+            cost = count_tokens(text) + (separator_tokens if parts else 0)
+
+        parts.append(text)
+        chosen.append(hit)
+        kept_shingles.append(shingles)
+        used += cost
+
+    if duplicates or over_budget:
+        logger.info(
+            f"Packed {len(chosen)} chunks into {used}/{budget} tokens "
+            f"({duplicates} near-duplicates, {over_budget} over budget dropped)"
+        )
+
+    return PackedContext(separator.join(parts), chosen, used, duplicates, over_budget)
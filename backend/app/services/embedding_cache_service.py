@@ -0,0 +1,174 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./embedding_cache.db")
+
+# 200k MiniLM vectors ≈ 300 MB of float32 blobs
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed on (model name, normalized text hash).
+    Vectors are stored as float32 blobs; the least recently used entries are
+    evicted once the cache grows past `max_entries`.
+    """
+
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_entries: int = EMBED_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> bytes:
+        data = f"{model_name}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found = {}
+        now = time.time()
+
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+        return found
+
+    def put_many(self, items: Dict[bytes, np.ndarray]) -> None:
+        if not items:
+            return
+        now = time.time()
+
+        with self._lock:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [
+                    (key, np.ascontiguousarray(vec, dtype=np.float32).tobytes(), now)
+                    for key, vec in items.items()
+                ],
+            )
+            self._count += max(cursor.rowcount, 0)
+
+            if self._count > self.max_entries:
+                # Evict down to 90% so eviction isn't paid on every insert
+                excess = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    """
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_used LIMIT ?
+                    )
+                    """,
+                    (excess,),
+                )
+                self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+            self._conn.commit()
+
+    def embed(
+        self,
+        model_name: str,
+        texts: List[str],
+        compute: Callable[[List[str]], np.ndarray],
+    ) -> np.ndarray:
+        """
+        Return a float32 (len(texts), dim) matrix, calling `compute` only for
+        texts that are not cached yet (each distinct text once).
+        """
+        keys = [self.make_key(model_name, t) for t in texts]
+        cached = self.get_many(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = np.asarray(compute(list(missing.values())), dtype=np.float32)
+            computed = dict(zip(missing.keys(), vectors))
+            self.put_many(computed)
+            cached.update(computed)
+
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([cached[key] for key in keys])
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache instance, or None when disabled or unavailable."""
+    global _cache
+    if not EMBED_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = EmbeddingCache()
+                except sqlite3.Error as e:
+                    logger.error(f"Embedding cache disabled: {e}")
+                    return None
+    return _cache
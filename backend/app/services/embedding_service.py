@@ -1,13 +1,23 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import List, Optional
+
+import numpy as np
+
+from app.clients.embed_client import EmbedClient
 
 
 class EmbeddingService:
-    def __init__(self):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+    """
+    Text embedding for the synchronous services. Shares the process-wide
+    embedding backend (EMBED_BACKEND) with the upload and chat paths, so the
+    model is loaded once and every path produces the same vectors.
+    """
+
+    def __init__(self, client: Optional[EmbedClient] = None):
+        self.client = client or EmbedClient()
 
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        return self.model.encode(texts, convert_to_numpy=True).tolist()
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        return self.client.embed(texts)
 
-    def embed_query(self, query: str) -> List[float]:
-        return self.model.encode(query).tolist()
+    def embed_query(self, query: str) -> np.ndarray:
+        # Queries bypass the persistent embedding cache, as on the chat path
+        return self.client.embed([query], use_cache=False)[0]
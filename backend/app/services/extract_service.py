@@ -0,0 +1,279 @@
+import os
+import logging
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional
+
+import PyPDF2
+from docx import Document
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+SPOOL_BLOCK_SIZE = int(os.getenv("UPLOAD_SPOOL_BLOCK_SIZE", str(1024 * 1024)))
+SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", tempfile.gettempdir())
+
+# Plain-text and HTML blocks are flushed once they reach this many characters
+TEXT_BLOCK_CHARS = 64 * 1024
+
+# CPU-bound parsing runs in a process pool; 0 disables it and parses in the calling thread
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+# PDF pages handed to one pool task (each task re-opens the PDF, so keep this above 1)
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tiff"}
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class ExtractionError(ValueError):
+    pass
+
+
+# ==============================
+# UPLOAD SPOOLING
+# ==============================
+async def spool_upload(
+    file,
+    suffix: str = "",
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    block_size: int = SPOOL_BLOCK_SIZE,
+) -> str:
+    """
+    Copy an UploadFile to a temp file one block at a time.
+    Returns the temp file path; the caller is responsible for deleting it.
+    """
+    size = 0
+    # The spool dir may be a fresh volume (compose mounts /data empty)
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=SPOOL_DIR)
+    try:
+        with tmp:
+            while True:
+                block = await file.read(block_size)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                tmp.write(block)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+
+    return tmp.name
+
+
+# ==============================
+# TEXT EXTRACTION (GENERATORS)
+# ==============================
+class _HTMLTextParser(HTMLParser):
+    """Incremental HTML → text parser that skips script/style content."""
+
+    SKIP_TAGS = {"script", "style", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+    def drain(self) -> str:
+        text = "\n".join(self.parts)
+        self.parts = []
+        return text
+
+
+def _iter_pdf(file_path: str) -> Iterator[str]:
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
+
+def _iter_plain_text(file_path: str) -> Iterator[str]:
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        buffer = []
+        size = 0
+        for line in f:
+            buffer.append(line)
+            size += len(line)
+            # Flush on paragraph breaks once the block is big enough
+            if size >= TEXT_BLOCK_CHARS or (not line.strip() and size >= TEXT_BLOCK_CHARS // 4):
+                yield "".join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield "".join(buffer)
+
+
+def _iter_docx(file_path: str) -> Iterator[str]:
+    doc = Document(file_path)
+    for p in doc.paragraphs:
+        if p.text.strip():
+            yield p.text
+
+
+def _iter_html(file_path: str) -> Iterator[str]:
+    parser = _HTMLTextParser()
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        while True:
+            block = f.read(TEXT_BLOCK_CHARS)
+            if not block:
+                break
+            parser.feed(block)
+            text = parser.drain()
+            if text.strip():
+                yield text
+    parser.close()
+    text = parser.drain()
+    if text.strip():
+        yield text
+
+
+def iter_text_blocks(file_path: str, filename: str) -> Iterator[str]:
+    """
+    Yield extracted text one page / paragraph / HTML block at a time.
+    A parser failure raises ExtractionError, even after some blocks were
+    yielded, so a half-read document is never indexed as if it were whole.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+
+    if ext == ".pdf":
+        blocks = _iter_pdf(file_path)
+    elif ext in [".txt", ".md", ".csv"]:
+        blocks = _iter_plain_text(file_path)
+    elif ext == ".docx":
+        blocks = _iter_docx(file_path)
+    elif ext in [".html", ".htm"]:
+        blocks = _iter_html(file_path)
+    elif ext in IMAGE_EXTENSIONS:
+        blocks = iter([f"[Image file: {filename}]"])
+    else:
+        return
+
+    try:
+        yield from blocks
+    except Exception as e:
+        raise ExtractionError(f"Text extraction failed: {e}") from e
+
+
+def extract_text_safe(file_path: str, filename: str) -> str:
+    """Whole document as one string; empty if extraction fails."""
+    try:
+        return "\n".join(iter_text_blocks(file_path, filename)).strip()
+    except ExtractionError as e:
+        logger.error(str(e))
+        return ""
+
+
+# ==============================
+# PROCESS POOL EXTRACTION
+# ==============================
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_extract_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if EXTRACT_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: the API and worker processes are multi-threaded, so fork is unsafe
+                _pool = ProcessPoolExecutor(
+                    max_workers=EXTRACT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown_extract_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> List[str]:
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _extract_blocks(file_path: str, filename: str) -> List[str]:
+    return list(iter_text_blocks(file_path, filename))
+
+
+def _pdf_page_count(file_path: str) -> int:
+    with open(file_path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def iter_text_blocks_parallel(file_path: str, filename: str) -> Iterator[str]:
+    """
+    Same output as `iter_text_blocks`, with parsing moved to the extraction pool.
+    PDFs fan out in page ranges across workers and are yielded back in page order;
+    at most two ranges per worker are in flight so memory stays bounded. Errors
+    raise ExtractionError like `iter_text_blocks`.
+    """
+    pool = get_extract_pool()
+    ext = os.path.splitext(filename)[1].lower()
+
+    # Plain text is I/O-bound and already streams cheaply
+    if pool is None or ext in [".txt", ".md", ".csv"] or ext in IMAGE_EXTENSIONS:
+        yield from iter_text_blocks(file_path, filename)
+        return
+
+    try:
+        if ext != ".pdf":
+            yield from pool.submit(_extract_blocks, file_path, filename).result()
+            return
+
+        page_count = _pdf_page_count(file_path)
+        ranges = (
+            (start, min(start + PDF_PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)
+        )
+        pending = deque()
+        max_in_flight = 2 * EXTRACT_WORKERS
+
+        try:
+            for start, stop in ranges:
+                pending.append(pool.submit(_extract_pdf_pages, file_path, start, stop))
+                if len(pending) >= max_in_flight:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    except ExtractionError:
+        raise
+    except Exception as e:
+        # Includes a broken pool and a failed page range: a gap in the pages must fail the job
+        raise ExtractionError(f"Text extraction failed: {e}") from e
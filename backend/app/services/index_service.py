@@ -0,0 +1,168 @@
+import os
+import logging
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+from app.clients.embed_client import EmbedClient
+from app.clients.vector_client import ChunkIds, VectorStore, chunk_hash
+from app.core.metrics import INGESTED_CHUNKS, TimedIterator, observe_stage
+from app.services.chunk_service import iter_chunks
+from app.services.extract_service import ExtractionError, iter_text_blocks_parallel
+from app.services.lexical_index_service import get_lexical_index
+
+logger = logging.getLogger(__name__)
+
+# Number of chunks embedded and upserted together; bounds peak memory per upload
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+# Documents with less extracted text than this are rejected
+MIN_TEXT_CHARS = 10
+
+
+class IndexResult(NamedTuple):
+    chunks: int       # chunks in the document
+    upserted: int     # chunks embedded and written
+    unchanged: int    # chunks whose point already existed (re-index only)
+    deleted: int      # stale points removed (re-index only)
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def index_file(
+    file_path: str,
+    filename: str,
+    document_id: str,
+    vector_store: VectorStore,
+    embed_client: Optional[EmbedClient] = None,
+    batch_size: int = INGEST_BATCH_SIZE,
+    on_progress: Optional[Callable[[int], None]] = None,
+    reindex: bool = False,
+    tags: Optional[List[str]] = None,
+    tenant_id: Optional[str] = None,
+) -> IndexResult:
+    """
+    Stream a file through extract → chunk → embed → upsert, one batch at a time.
+    Point ids are derived from (document_id, chunk hash, occurrence), so with
+    `reindex=True` chunks that already exist are skipped even if they moved,
+    and points the new version no longer produces are deleted once the whole
+    document has been extracted and written. If anything fails on the way the
+    points written so far are removed again and the stored version is untouched.
+    Every chunk is also added to the collection's BM25 index for hybrid search.
+    `tags` and `tenant_id` go on every payload for scoped search; a re-index
+    replaces them on the document's unchanged points too.
+    `on_progress` is called with the running chunk count after each batch.
+    """
+    embed_client = embed_client or EmbedClient()
+    lexical = get_lexical_index(vector_store.collection_name)
+    # Chunks are sized with the embedding model's own tokenizer so none get truncated
+    # Extraction and chunking are lazy, so their time is accumulated as batches are pulled
+    blocks = TimedIterator(iter_text_blocks_parallel(file_path, filename))
+    chunks = TimedIterator(iter_chunks(blocks, embed_client.count_tokens))
+    # Point id → chunk_index of the stored version
+    existing = vector_store.get_document_chunk_indexes(document_id) if reindex else {}
+    chunk_ids = ChunkIds(document_id)
+    current = set()
+    written = []      # ids submitted in this run, removed again if it fails
+    moved = {}        # unchanged point id → its new chunk_index
+    stored = 0
+    upserted = 0
+
+    try:
+        # Upserts run on the writer's connections while the next batch is embedded
+        with vector_store.bulk_writer() as writer:
+            for batch in batched(chunks, batch_size):
+                # A short first batch is the whole document, so it can be checked before indexing
+                if stored == 0 and len(batch) < batch_size and sum(len(c) for c in batch) < MIN_TEXT_CHARS:
+                    break
+
+                ids = []
+                payloads = []
+                batch_ids = []
+                for i, chunk in enumerate(batch):
+                    text_hash = chunk_hash(chunk)
+                    pid = chunk_ids.next(text_hash)
+                    current.add(pid)
+                    batch_ids.append(pid)
+                    if pid in existing:
+                        # Unchanged chunk; only its position may have shifted
+                        if existing[pid] != stored + i:
+                            moved[pid] = stored + i
+                        continue
+                    ids.append(pid)
+                    payloads.append(
+                        {
+                            "text": chunk,
+                            "filename": filename,
+                            "document_id": document_id,
+                            "chunk_index": stored + i,
+                            "chunk_hash": text_hash,
+                            "tags": tags or [],
+                            "tenant_id": tenant_id,
+                        }
+                    )
+
+                if payloads:
+                    embeddings = embed_client.embed([p["text"] for p in payloads])
+                    # Recorded before submitting so a batch that fails mid-upload is cleaned up too
+                    written.extend(ids)
+                    writer.submit(embeddings, payloads, ids)
+                    upserted += len(payloads)
+                # Unchanged chunks go through too, so documents indexed before the BM25 index get backfilled
+                if lexical is not None:
+                    lexical.add(document_id, batch_ids, batch)
+                stored += len(batch)
+
+                if on_progress:
+                    on_progress(stored)
+
+    except BaseException:
+        # A failed run must not leave half a new version next to the old one
+        _remove_partial(vector_store, lexical, document_id, written)
+        raise
+
+    observe_stage("extract", blocks.elapsed)
+    observe_stage("chunk", chunks.elapsed - blocks.elapsed)
+    INGESTED_CHUNKS.inc(upserted)
+
+    if stored == 0:
+        raise ExtractionError("No meaningful text extracted from the document")
+
+    # Only reached once the whole document was extracted and written, so stale really means removed
+    if lexical is not None:
+        lexical.set_document_scope(document_id, tenant_id, tags or [])
+    deleted = 0
+    if reindex:
+        stale = set(existing) - current
+        deleted = vector_store.delete_points(stale)
+        if lexical is not None:
+            lexical.delete_points(stale)
+        if moved:
+            vector_store.set_chunk_indexes(moved)
+        if upserted < stored:
+            vector_store.set_document_payload(document_id, {"tags": tags or [], "tenant_id": tenant_id})
+
+    result = IndexResult(stored, upserted, stored - upserted, deleted)
+    logger.info(
+        f"Indexed {result.chunks} chunks for document_id='{document_id}' "
+        f"({result.upserted} upserted, {result.unchanged} unchanged, {result.deleted} deleted)"
+    )
+    return result
+
+
+def _remove_partial(vector_store: VectorStore, lexical, document_id: str, written: List[str]):
+    if not written:
+        return
+    logger.warning(f"Indexing document_id='{document_id}' failed; removing {len(written)} new points")
+    try:
+        vector_store.delete_points(written)
+        if lexical is not None:
+            lexical.delete_points(written)
+    except Exception:
+        logger.exception(f"Could not remove partial points of document_id='{document_id}'")
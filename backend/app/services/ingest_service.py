@@ -1,22 +1,13 @@
-from typing import List
 from sqlalchemy.orm import Session
 
 from app.models.document import Document
 from app.services.embedding_service import EmbeddingService
-from app.clients.vector_client import VectorStore
-
-
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
-    chunks = []
-    start = 0
-
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start = end - overlap
-
-    return chunks
+from app.clients.registry import get_registry
+from app.clients.vector_client import ChunkIds, chunk_hash
+from app.services.lexical_index_service import get_lexical_index
+from app.services.semantic_cache_service import get_semantic_cache
+from app.services.chunk_service import chunk_text
+from app.core.metrics import INGESTED_CHUNKS, stage_timer
 
 
 def ingest_document(
@@ -32,23 +23,37 @@ def ingest_document(
     db.commit()
     db.refresh(document)
 
-    chunks = chunk_text(content)
-
     embedder = EmbeddingService()
+    with stage_timer("chunk"):
+        chunks = chunk_text(content, embedder.client.count_tokens)
+
     vectors = embedder.embed_texts(chunks)
 
-    vector_store = VectorStore(collection_name="enterprise_docs")
+    vector_store = get_registry().vector_store("enterprise_docs")
 
     payloads = [
         {
             "document_id": document.id,
             "text": chunk,
             "filename": filename,
+            "chunk_index": i,
         }
-        for chunk in chunks
+        for i, chunk in enumerate(chunks)
     ]
 
-    vector_store.add_embeddings(vectors, payloads)
+    chunk_ids = ChunkIds(document.id)
+    ids = [chunk_ids.next(chunk_hash(chunk)) for chunk in chunks]
+    vector_store.add_embeddings(vectors, payloads, ids)
+    INGESTED_CHUNKS.inc(len(chunks))
+
+    lexical = get_lexical_index(vector_store.collection_name)
+    if lexical is not None:
+        lexical.add(document.id, ids, chunks)
+        lexical.set_document_scope(document.id)
+
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        semantic_cache.invalidate(document.id)
 
     return {
         "document_id": document.id,
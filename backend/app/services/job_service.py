@@ -0,0 +1,305 @@
+import os
+import json
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import create_engine, event, func, inspect, select, text, update
+from sqlalchemy.orm import aliased, sessionmaker
+
+from app.db.base import Base
+from app.models.job import IngestJob
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# QUEUE STORAGE (SQLITE STAND-IN FOR A BROKER)
+# ==============================
+# Point the API and the worker at the same file when they run as separate processes
+JOB_QUEUE_URL = os.getenv("JOB_QUEUE_URL", "sqlite:///./ingest_jobs.db")
+
+# A running job whose worker hasn't sent a heartbeat for this long is considered abandoned
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+# Abandoned jobs are re-queued until they have been claimed this many times, then failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+engine = create_engine(
+    JOB_QUEUE_URL,
+    connect_args={"check_same_thread": False, "timeout": 30},
+    echo=False,
+)
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, _):
+    # WAL lets the API read job status while a worker is writing progress
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+
+JobSession = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine,
+)
+
+_tables_ready = False
+_tables_lock = threading.Lock()
+
+# Wakes in-process workers as soon as a job is enqueued instead of waiting for the next poll
+_job_available = threading.Event()
+
+
+def _ensure_tables():
+    global _tables_ready
+    if _tables_ready:
+        return
+    with _tables_lock:
+        if not _tables_ready:
+            Base.metadata.create_all(bind=engine, tables=[IngestJob.__table__])
+            _add_missing_columns()
+            _tables_ready = True
+
+
+def _add_missing_columns():
+    # Queue files outlive deploys; new nullable columns are added in place
+    existing = {c["name"] for c in inspect(engine).get_columns(IngestJob.__tablename__)}
+    with engine.begin() as conn:
+        for column in IngestJob.__table__.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {IngestJob.__tablename__} ADD COLUMN {column.name} {column_type}"))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ==============================
+# PRODUCER SIDE
+# ==============================
+def enqueue_ingest(
+    file_path: str,
+    filename: str,
+    document_id: str,
+    collection_name: str,
+    kind: str = "ingest",
+    tags: Optional[List[str]] = None,
+    tenant_id: Optional[str] = None,
+) -> IngestJob:
+    """Queue a spooled upload. `kind` is "ingest" for new documents or "reindex" for updates."""
+    _ensure_tables()
+    job = IngestJob(
+        id=str(uuid.uuid4()),
+        # Set here rather than by the server default, whose CURRENT_TIMESTAMP has one-second resolution
+        created_at=_now(),
+        kind=kind,
+        status="queued",
+        stage="queued",
+        document_id=document_id,
+        filename=filename,
+        file_path=file_path,
+        collection_name=collection_name,
+        tags=json.dumps(tags) if tags else None,
+        tenant_id=tenant_id,
+    )
+    with JobSession() as db:
+        db.add(job)
+        db.commit()
+
+    _job_available.set()
+    return job
+
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    _ensure_tables()
+    with JobSession() as db:
+        return db.get(IngestJob, job_id)
+
+
+def count_jobs(status: str) -> int:
+    _ensure_tables()
+    with JobSession() as db:
+        return db.execute(
+            select(func.count()).select_from(IngestJob).where(IngestJob.status == status)
+        ).scalar()
+
+
+def document_has_jobs(document_id: str) -> bool:
+    """Whether a document was uploaded through the queue (any job that didn't fail)."""
+    _ensure_tables()
+    with JobSession() as db:
+        return db.execute(
+            select(IngestJob.id)
+            .where(IngestJob.document_id == document_id, IngestJob.status != "failed")
+            .limit(1)
+        ).first() is not None
+
+
+def completed_since(since: datetime) -> List[Tuple[str, str, datetime]]:
+    """(job id, document id, finished_at) of jobs completed after `since`, oldest first."""
+    _ensure_tables()
+    with JobSession() as db:
+        return [
+            tuple(row)
+            for row in db.execute(
+                select(IngestJob.id, IngestJob.document_id, IngestJob.finished_at)
+                .where(IngestJob.status == "completed", IngestJob.finished_at > since)
+                .order_by(IngestJob.finished_at)
+            )
+        ]
+
+
+def job_tags(job: IngestJob) -> List[str]:
+    return json.loads(job.tags) if job.tags else []
+
+
+def job_to_dict(job: IngestJob) -> dict:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "stage": job.stage,
+        "document_id": job.document_id,
+        "filename": job.filename,
+        "tags": job_tags(job),
+        "tenant_id": job.tenant_id,
+        "chunks_stored": job.chunks_stored,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# ==============================
+# WORKER SIDE
+# ==============================
+def wait_for_jobs(timeout: float) -> None:
+    """Block until a job is enqueued in this process or `timeout` elapses."""
+    if _job_available.wait(timeout):
+        _job_available.clear()
+
+
+def _document_busy():
+    # True when another job for the same document is running; correlated against IngestJob
+    running = aliased(IngestJob)
+    return (
+        select(running.id)
+        .where(running.document_id == IngestJob.document_id, running.status == "running")
+        .exists()
+    )
+
+
+def reclaim_expired_jobs(lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+    """
+    Re-queue running jobs whose worker stopped sending heartbeats (crashed or
+    killed), or fail them once they have used up `max_attempts` claims.
+    Returns how many jobs were re-queued or failed.
+    """
+    _ensure_tables()
+    cutoff = _now() - timedelta(seconds=lease_seconds)
+    expired = (
+        IngestJob.status == "running",
+        func.coalesce(IngestJob.heartbeat_at, IngestJob.started_at) < cutoff,
+    )
+    with JobSession() as db:
+        requeued = db.execute(
+            update(IngestJob)
+            .where(*expired, IngestJob.attempts < max_attempts)
+            .values(status="queued", stage="queued", error="Worker lost; re-queued")
+        ).rowcount
+        failed = db.execute(
+            update(IngestJob)
+            .where(*expired, IngestJob.attempts >= max_attempts)
+            .values(
+                status="failed",
+                stage="failed",
+                error=f"Worker lost on all {max_attempts} attempts",
+                finished_at=_now(),
+            )
+        ).rowcount
+        db.commit()
+    if requeued or failed:
+        logger.warning(f"Reclaimed abandoned ingest jobs: {requeued} re-queued, {failed} failed")
+    return requeued + failed
+
+
+def claim_next_job() -> Optional[IngestJob]:
+    """
+    Atomically move the oldest queued job to `running` and return it. Jobs for
+    a document that already has a running job wait, so an ingest and a
+    re-index of one document never diff against each other's half-written points.
+    Abandoned running jobs are reclaimed first.
+    """
+    reclaim_expired_jobs()
+    with JobSession() as db:
+        while True:
+            job_id = db.execute(
+                select(IngestJob.id)
+                .where(IngestJob.status == "queued", ~_document_busy())
+                # id breaks ties between jobs created in the same instant
+                .order_by(IngestJob.created_at, IngestJob.id)
+                .limit(1)
+            ).scalar()
+            if job_id is None:
+                return None
+
+            # Conditional update so two workers can never claim the same job, nor two jobs of one document
+            result = db.execute(
+                update(IngestJob)
+                .where(IngestJob.id == job_id, IngestJob.status == "queued", ~_document_busy())
+                .values(
+                    status="running",
+                    stage="indexing",
+                    started_at=_now(),
+                    heartbeat_at=_now(),
+                    attempts=IngestJob.attempts + 1,
+                )
+            )
+            db.commit()
+            if result.rowcount == 1:
+                return db.get(IngestJob, job_id)
+
+
+def heartbeat(job_id: str) -> None:
+    """Extend a running job's lease."""
+    with JobSession() as db:
+        db.execute(
+            update(IngestJob)
+            .where(IngestJob.id == job_id, IngestJob.status == "running")
+            .values(heartbeat_at=_now())
+        )
+        db.commit()
+
+
+def update_job(job_id: str, **fields) -> None:
+    with JobSession() as db:
+        db.execute(update(IngestJob).where(IngestJob.id == job_id).values(**fields))
+        db.commit()
+
+
+def complete_job(job_id: str, chunks_stored: int) -> None:
+    update_job(
+        job_id,
+        status="completed",
+        stage="done",
+        error=None,
+        chunks_stored=chunks_stored,
+        finished_at=_now(),
+    )
+
+
+def fail_job(job_id: str, error: str) -> None:
+    update_job(
+        job_id,
+        status="failed",
+        stage="failed",
+        error=error,
+        finished_at=_now(),
+    )
@@ -0,0 +1,375 @@
+import os
+import re
+import math
+import sqlite3
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+LEXICAL_INDEX_ENABLED = os.getenv("LEXICAL_INDEX_ENABLED", "true").lower() == "true"
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "./lexical_index")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Keeps part numbers, policy codes and versions ("AB-1234", "HR.4.2", "v2_1") as single tokens
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "where",
+    "which", "who", "why", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound codes are indexed whole and as their parts."""
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(p for p in re.split(r"[-_./]", token) if p and p not in _STOPWORDS)
+    return terms
+
+
+# ==============================
+# POSTING LIST ENCODING
+# ==============================
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_postings(postings: Sequence[Tuple[int, int]]) -> bytes:
+    """(ordinal, term frequency) pairs, sorted by ordinal, as delta-encoded varints."""
+    out = bytearray()
+    previous = 0
+    for ordinal, tf in postings:
+        _write_varint(out, ordinal - previous)
+        _write_varint(out, tf)
+        previous = ordinal
+    return bytes(out)
+
+
+def decode_postings(data: bytes) -> List[Tuple[int, int]]:
+    postings = []
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+
+    ordinal = 0
+    for i in range(0, len(values), 2):
+        ordinal += values[i]
+        postings.append((ordinal, values[i + 1]))
+    return postings
+
+
+class LexicalScope(NamedTuple):
+    """Documents a search may return; unset fields don't restrict it (tags match any)."""
+    document_ids: Optional[Sequence] = None
+    tenant_id: Optional[str] = None
+    tags: Optional[Sequence[str]] = None
+
+
+class LexicalIndex:
+    """
+    On-disk BM25 inverted index for one collection, stored in SQLite.
+    Posting lists are kept per (term, document_id) so scoped searches only read
+    the postings of documents in scope and re-indexing touches one row per term.
+    Each document's tenant and tags are kept alongside, so tenant and tag scopes
+    are resolved to documents before any posting list is decoded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                ord INTEGER PRIMARY KEY AUTOINCREMENT,
+                point_id TEXT NOT NULL UNIQUE,
+                document_id TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                terms TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks (document_id);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (term, document_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                df INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS documents (
+                document_id TEXT PRIMARY KEY,
+                tenant_id TEXT
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_documents_tenant ON documents (tenant_id);
+            CREATE TABLE IF NOT EXISTS document_tags (
+                tag TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                PRIMARY KEY (tag, document_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    # ---------- WRITES ----------
+    def add(self, document_id, point_ids: Sequence[str], texts: Sequence[str]) -> int:
+        """Index chunks of one document; point ids that are already indexed are skipped."""
+        document_id = str(document_id)
+
+        with self._lock:
+            placeholders = ",".join("?" * len(point_ids))
+            known = {
+                row[0]
+                for row in self._conn.execute(
+                    f"SELECT point_id FROM chunks WHERE point_id IN ({placeholders})",
+                    list(point_ids),
+                )
+            } if point_ids else set()
+
+            new_postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+            added = 0
+            for pid, text in zip(point_ids, texts):
+                if pid in known:
+                    continue
+                counts = Counter(tokenize(text))
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks (point_id, document_id, length, terms) VALUES (?, ?, ?, ?)",
+                    (pid, document_id, sum(counts.values()), " ".join(counts)),
+                )
+                for term, tf in counts.items():
+                    new_postings[term].append((cursor.lastrowid, tf))
+                added += 1
+
+            for term, postings in new_postings.items():
+                row = self._conn.execute(
+                    "SELECT data FROM postings WHERE term = ? AND document_id = ?",
+                    (term, document_id),
+                ).fetchone()
+                merged = (decode_postings(row[0]) if row else []) + postings
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO postings (term, document_id, data) VALUES (?, ?, ?)",
+                    (term, document_id, encode_postings(merged)),
+                )
+                self._conn.execute(
+                    "INSERT INTO terms (term, df) VALUES (?, ?) "
+                    "ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                    (term, len(postings)),
+                )
+
+            self._conn.commit()
+            return added
+
+    def set_document_scope(self, document_id, tenant_id: Optional[str] = None, tags: Sequence[str] = ()):
+        """Record the tenant and tags a document is searchable under, replacing earlier ones."""
+        document_id = str(document_id)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (document_id, tenant_id) VALUES (?, ?)",
+                (document_id, tenant_id),
+            )
+            self._conn.execute("DELETE FROM document_tags WHERE document_id = ?", (document_id,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO document_tags (tag, document_id) VALUES (?, ?)",
+                [(tag, document_id) for tag in tags or ()],
+            )
+            self._conn.commit()
+
+    def delete_points(self, point_ids: Iterable[str]) -> int:
+        point_ids = list(point_ids)
+        if not point_ids:
+            return 0
+
+        with self._lock:
+            rows = []
+            for i in range(0, len(point_ids), 500):
+                batch = point_ids[i:i + 500]
+                rows += self._conn.execute(
+                    f"SELECT ord, document_id, terms FROM chunks WHERE point_id IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+
+            removed: Dict[Tuple[str, str], set] = defaultdict(set)
+            for ordinal, document_id, terms in rows:
+                for term in terms.split():
+                    removed[(term, document_id)].add(ordinal)
+
+            for (term, document_id), ordinals in removed.items():
+                row = self._conn.execute(
+                    "SELECT data FROM postings WHERE term = ? AND document_id = ?",
+                    (term, document_id),
+                ).fetchone()
+                if row is None:
+                    continue
+                kept = [p for p in decode_postings(row[0]) if p[0] not in ordinals]
+                if kept:
+                    self._conn.execute(
+                        "UPDATE postings SET data = ? WHERE term = ? AND document_id = ?",
+                        (encode_postings(kept), term, document_id),
+                    )
+                else:
+                    self._conn.execute(
+                        "DELETE FROM postings WHERE term = ? AND document_id = ?",
+                        (term, document_id),
+                    )
+                self._conn.execute(
+                    "UPDATE terms SET df = df - ? WHERE term = ?", (len(ordinals), term)
+                )
+
+            self._conn.executemany("DELETE FROM chunks WHERE ord = ?", [(r[0],) for r in rows])
+            self._conn.execute("DELETE FROM terms WHERE df <= 0")
+            # Scope rows of documents that have no chunks left
+            emptied = [
+                (document_id,)
+                for document_id in {r[1] for r in rows}
+                if self._conn.execute(
+                    "SELECT 1 FROM chunks WHERE document_id = ? LIMIT 1", (document_id,)
+                ).fetchone() is None
+            ]
+            self._conn.executemany("DELETE FROM documents WHERE document_id = ?", emptied)
+            self._conn.executemany("DELETE FROM document_tags WHERE document_id = ?", emptied)
+            self._conn.commit()
+            return len(rows)
+
+    def clear(self):
+        with self._lock:
+            self._conn.executescript(
+                "DELETE FROM chunks; DELETE FROM postings; DELETE FROM terms; "
+                "DELETE FROM documents; DELETE FROM document_tags;"
+            )
+            self._conn.commit()
+
+    # ---------- SEARCH ----------
+    @staticmethod
+    def _scope_condition(scope: Optional[LexicalScope]) -> Tuple[str, list]:
+        # SQL condition on postings.document_id (and its parameters) selecting the documents in scope
+        clauses = []
+        params: list = []
+        if scope is None:
+            return "", params
+        if scope.document_ids is not None:
+            clauses.append(f"document_id IN ({','.join('?' * len(scope.document_ids))})")
+            params += [str(d) for d in scope.document_ids]
+        if scope.tenant_id:
+            clauses.append("document_id IN (SELECT document_id FROM documents WHERE tenant_id = ?)")
+            params.append(scope.tenant_id)
+        if scope.tags:
+            tags = sorted(set(scope.tags))
+            clauses.append(
+                f"document_id IN (SELECT document_id FROM document_tags WHERE tag IN ({','.join('?' * len(tags))}))"
+            )
+            params += tags
+        return " AND ".join(clauses), params
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        scope: Optional[LexicalScope] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        BM25 top-k as (point_id, score). With a scope, only postings of the
+        documents in it are read and scored, so the top-k is the scope's own.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        scope_sql, scope_params = self._scope_condition(scope)
+
+        with self._lock:
+            total, length_sum = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+            ).fetchone()
+            if not total:
+                return []
+            avg_length = length_sum / total
+
+            scores: Dict[int, float] = defaultdict(float)
+            term_postings = []
+            for term in terms:
+                row = self._conn.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+                if row is None:
+                    continue
+                idf = math.log(1 + (total - row[0] + 0.5) / (row[0] + 0.5))
+
+                sql = "SELECT data FROM postings WHERE term = ?"
+                if scope_sql:
+                    sql += " AND " + scope_sql
+                for (data,) in self._conn.execute(sql, [term, *scope_params]):
+                    term_postings.append((idf, decode_postings(data)))
+
+            ordinals = {o for _, postings in term_postings for o, _ in postings}
+            if not ordinals:
+                return []
+
+            lengths = {}
+            ordinal_list = list(ordinals)
+            for i in range(0, len(ordinal_list), 500):
+                batch = ordinal_list[i:i + 500]
+                lengths.update(
+                    self._conn.execute(
+                        f"SELECT ord, length FROM chunks WHERE ord IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                )
+
+            for idf, postings in term_postings:
+                for ordinal, tf in postings:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[ordinal] / avg_length)
+                    scores[ordinal] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            ids = dict(
+                self._conn.execute(
+                    f"SELECT ord, point_id FROM chunks WHERE ord IN ({','.join('?' * len(top))})",
+                    [o for o, _ in top],
+                ).fetchall()
+            )
+            return [(ids[o], score) for o, score in top]
+
+
+_indexes: Dict[str, LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(collection_name: str) -> Optional[LexicalIndex]:
+    """Process-wide index for a collection, or None when disabled or unavailable."""
+    if not LEXICAL_INDEX_ENABLED:
+        return None
+    index = _indexes.get(collection_name)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(collection_name)
+            if index is None:
+                try:
+                    os.makedirs(LEXICAL_INDEX_DIR, exist_ok=True)
+                    index = LexicalIndex(os.path.join(LEXICAL_INDEX_DIR, f"{collection_name}.db"))
+                except (OSError, sqlite3.Error) as e:
+                    logger.error(f"Lexical index disabled for '{collection_name}': {e}")
+                    return None
+                _indexes[collection_name] = index
+    return index
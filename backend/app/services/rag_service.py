@@ -1,15 +1,20 @@
 from app.services.embedding_service import EmbeddingService
-from app.clients.vector_client import VectorStore
-from app.clients.llm_client import LLMClient
+from app.clients.registry import get_registry
 from app.services.cache_service import CacheService
+from app.services.retrieval_service import hybrid_search_sync
+from app.services.context_service import pack_context
+from app.clients.rerank_client import RERANK_CANDIDATES, get_rerank_client
+from app.core.tokens import count_tokens
+from app.services.semantic_cache_service import ALL_DOCUMENTS, get_semantic_cache
 from app.core.rate_limit import RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW
 
 
 class RAGService:
     def __init__(self):
         self.embedder = EmbeddingService()
-        self.vector_store = VectorStore(collection_name="enterprise_docs")
-        self.llm = LLMClient()
+        clients = get_registry()
+        self.vector_store = clients.vector_store("enterprise_docs")
+        self.llm = clients.llm_client()
         self.cache = CacheService()
 
     def answer_question(self, question: str, user_id: str = "anonymous") -> dict:
@@ -33,12 +38,27 @@ class RAGService:
         # ---------- EMBED QUERY ----------
         query_vector = self.embedder.embed_query(question)
 
-        # ---------- VECTOR SEARCH ----------
-        results = self.vector_store.search(
-            query_vector=query_vector,
-            limit=5,
+        # ---------- SEMANTIC CACHE ----------
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None:
+            cached = semantic_cache.lookup(ALL_DOCUMENTS, query_vector)
+            if cached:
+                self.cache.set(cache_key, cached)
+                return cached
+
+        # ---------- HYBRID SEARCH (DENSE + BM25) ----------
+        reranker = get_rerank_client()
+        results = hybrid_search_sync(
+            self.vector_store,
+            question,
+            query_vector,
+            limit=RERANK_CANDIDATES if reranker else 5,
         )
 
+        # ---------- RERANK (OPTIONAL) ----------
+        if reranker is not None and results:
+            results = reranker.rerank(question, results)
+
         if not results:
             response = {
                 "answer": "I could not find relevant information.",
@@ -48,20 +68,16 @@ class RAGService:
             return response
 
         # ---------- CONTEXT BUILD ----------
-        context_chunks = []
-        sources = []
-
-        for hit in results:
-            payload = hit.payload
-            context_chunks.append(payload["text"])
-            sources.append(
-                {
-                    "document_id": payload["document_id"],
-                    "filename": payload["filename"],
-                }
-            )
+        packed = pack_context(results)
+        sources = [
+            {
+                "document_id": hit.payload["document_id"],
+                "filename": hit.payload["filename"],
+            }
+            for hit in packed.hits
+        ]
 
-        context = "\n\n".join(context_chunks)
+        context = packed.text
 
         prompt = f"""
 Use the following context to answer the question.
@@ -79,9 +95,12 @@ Question:
         response = {
             "answer": answer,
             "sources": sources,
+            "prompt_tokens": count_tokens(prompt),
         }
 
         # ---------- CACHE RESPONSE ----------
         self.cache.set(cache_key, response)
+        if semantic_cache is not None:
+            semantic_cache.store(ALL_DOCUMENTS, query_vector, response)
 
         return response
@@ -0,0 +1,129 @@
+import os
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from qdrant_client.models import Filter, ScoredPoint
+from starlette.concurrency import run_in_threadpool
+
+from app.clients.vector_client import VectorStore
+from app.core.metrics import stage_timer
+from app.services.lexical_index_service import LexicalScope, get_lexical_index
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+
+# Candidates taken from each retriever before fusion; only `limit` fused hits reach the prompt
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "30"))
+
+# Reciprocal rank fusion constant; larger values flatten the advantage of top ranks
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+
+def rrf_fuse(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Reciprocal rank fusion of ranked id lists, best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, pid in enumerate(ranking):
+            scores[pid] = scores.get(pid, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _fused_points(dense_hits, lexical_hits, extra_records, limit: int) -> List[ScoredPoint]:
+    payloads = {str(h.id): h.payload for h in dense_hits}
+    payloads.update({str(r.id): r.payload for r in extra_records})
+
+    # Lexical hits without a fetched point (deleted since indexing, or outside the filter) are dropped
+    lexical_ranking = [pid for pid, _ in lexical_hits if pid in payloads]
+    fused = rrf_fuse([[str(h.id) for h in dense_hits], lexical_ranking])[:limit]
+
+    return [ScoredPoint(id=pid, version=0, score=score, payload=payloads[pid]) for pid, score in fused]
+
+
+def _lexical_only_ids(dense_hits, lexical_hits) -> List[str]:
+    """Lexical candidates dense search didn't return; their payloads (and filter match) must be fetched."""
+    dense_ids = {str(h.id) for h in dense_hits}
+    return [pid for pid, _ in lexical_hits if pid not in dense_ids]
+
+
+async def hybrid_search(
+    vector_store: VectorStore,
+    query: str,
+    query_vector: Union[np.ndarray, List[float]],
+    limit: int = 10,
+    query_filter: Optional[Filter] = None,
+    lexical_scope: Optional[LexicalScope] = None,
+) -> List[ScoredPoint]:
+    """
+    Dense search fused with BM25 over the collection's lexical index.
+    `lexical_scope` restricts the BM25 scan to the documents `query_filter`
+    selects; lexical-only candidates are still fetched through `query_filter`,
+    which also drops any that went out of scope since they were indexed.
+    Hit scores are RRF scores. Falls back to dense search alone when the
+    lexical index is disabled or unavailable.
+    """
+    lexical = get_lexical_index(vector_store.collection_name) if HYBRID_SEARCH_ENABLED else None
+    if lexical is None:
+        with stage_timer("vector_search"):
+            return await vector_store.asearch(query_vector, limit, query_filter)
+
+    candidates = max(limit, HYBRID_CANDIDATES)
+    with stage_timer("vector_search"):
+        dense_hits = await vector_store.asearch(query_vector, candidates, query_filter)
+    try:
+        with stage_timer("lexical_search"):
+            lexical_hits = await run_in_threadpool(lexical.search, query, candidates, lexical_scope)
+    except Exception:
+        logger.exception("Lexical search failed; using dense results only")
+        return dense_hits[:limit]
+
+    extra = []
+    missing = _lexical_only_ids(dense_hits, lexical_hits)
+    if missing:
+        try:
+            with stage_timer("vector_retrieve"):
+                extra = await vector_store.aretrieve(missing, query_filter)
+        except Exception as e:
+            logger.warning(f"Payload fetch for lexical hits failed: {e}")
+
+    return _fused_points(dense_hits, lexical_hits, extra, limit)
+
+
+def hybrid_search_sync(
+    vector_store: VectorStore,
+    query: str,
+    query_vector: Union[np.ndarray, List[float]],
+    limit: int = 5,
+    query_filter: Optional[Filter] = None,
+    lexical_scope: Optional[LexicalScope] = None,
+) -> List[ScoredPoint]:
+    """Blocking variant of `hybrid_search` for the synchronous services."""
+    lexical = get_lexical_index(vector_store.collection_name) if HYBRID_SEARCH_ENABLED else None
+    if lexical is None:
+        with stage_timer("vector_search"):
+            return vector_store.search(query_vector, limit, query_filter)
+
+    candidates = max(limit, HYBRID_CANDIDATES)
+    with stage_timer("vector_search"):
+        dense_hits = vector_store.search(query_vector, candidates, query_filter)
+    try:
+        with stage_timer("lexical_search"):
+            lexical_hits = lexical.search(query, candidates, lexical_scope)
+    except Exception:
+        logger.exception("Lexical search failed; using dense results only")
+        return dense_hits[:limit]
+
+    extra = []
+    missing = _lexical_only_ids(dense_hits, lexical_hits)
+    if missing:
+        try:
+            with stage_timer("vector_retrieve"):
+                extra = vector_store.retrieve(missing, query_filter)
+        except Exception as e:
+            logger.warning(f"Payload fetch for lexical hits failed: {e}")
+
+    return _fused_points(dense_hits, lexical_hits, extra, limit)
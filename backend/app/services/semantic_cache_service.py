@@ -0,0 +1,212 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIG
+# ==============================
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+
+# Minimum cosine similarity between query embeddings for a cached answer to be reused
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+
+# How often the API checks the job queue for documents an external worker finished re-indexing
+SEMANTIC_CACHE_INVALIDATION_POLL = float(os.getenv("SEMANTIC_CACHE_INVALIDATION_POLL", "2.0"))
+# Jobs are re-read this far back so one committed slightly out of finish order isn't missed
+_INVALIDATION_LOOKBACK = timedelta(seconds=10)
+
+# Scope used for answers that were not restricted to one document. Other
+# multi-document scopes ("*docs:...", "*tags:...") share the prefix, so a
+# re-indexed document invalidates every scope that may have included it.
+ALL_DOCUMENTS = "*"
+
+
+class _Bucket:
+    """Entries for one document, with their normalized vectors stacked for one matmul per lookup."""
+
+    def __init__(self):
+        self.keys = []
+        self.vectors = []
+        self._matrix = None
+
+    def add(self, key: int, vector: np.ndarray):
+        self.keys.append(key)
+        self.vectors.append(vector)
+        self._matrix = None
+
+    def remove(self, key: int):
+        i = self.keys.index(key)
+        del self.keys[i]
+        del self.vectors[i]
+        self._matrix = None
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.stack(self.vectors)
+        return self._matrix
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on (document_id, query embedding). A lookup hits when a
+    cached query for the same document is within `threshold` cosine similarity.
+    Bounded by `max_entries` with LRU eviction; entries expire after `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: int = SEMANTIC_CACHE_TTL,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # key → (document_id, value, expiry), oldest first
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._buckets: Dict[str, _Bucket] = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, key: int):
+        document_id, _, _ = self._entries.pop(key)
+        bucket = self._buckets[document_id]
+        bucket.remove(key)
+        if not bucket.keys:
+            del self._buckets[document_id]
+
+    def lookup(self, document_id: str, query_vector) -> Optional[Any]:
+        query = self._normalize(query_vector)
+
+        with self._lock:
+            bucket = self._buckets.get(str(document_id))
+            if bucket is not None:
+                scores = bucket.matrix() @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = bucket.keys[best]
+                    _, value, expiry = self._entries[key]
+                    if time.time() <= expiry:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return value
+                    self._remove(key)
+
+            self.misses += 1
+            return None
+
+    def store(self, document_id: str, query_vector, value: Any):
+        query = self._normalize(query_vector)
+
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = (str(document_id), value, time.time() + self.ttl)
+            self._buckets.setdefault(str(document_id), _Bucket()).add(key, query)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, document_id: str):
+        """Drop answers for a re-indexed document, plus every multi-document answer."""
+        with self._lock:
+            scopes = [str(document_id)] + [s for s in self._buckets if s.startswith(ALL_DOCUMENTS)]
+            for scope in scopes:
+                bucket = self._buckets.get(scope)
+                if bucket is None:
+                    continue
+                for key in list(bucket.keys):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "documents": len(self._buckets),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "threshold": self.threshold,
+            }
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Process-wide cache instance, or None when disabled."""
+    global _cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache()
+    return _cache
+
+
+def _watch_completed_jobs(cache: SemanticCache, stop_event: threading.Event, poll_interval: float):
+    from app.services import job_service
+
+    watermark = job_service._now()
+    seen = set()
+    while not stop_event.wait(poll_interval):
+        try:
+            rows = job_service.completed_since(watermark - _INVALIDATION_LOOKBACK)
+        except Exception:
+            logger.exception("Failed to read completed jobs for cache invalidation")
+            continue
+        for job_id, document_id, finished_at in rows:
+            if job_id not in seen:
+                cache.invalidate(document_id)
+            watermark = max(watermark, finished_at.replace(tzinfo=watermark.tzinfo))
+        # Later windows only overlap this one, so ids from older windows can't reappear
+        seen = {job_id for job_id, _, _ in rows}
+
+
+def start_invalidation_watcher(poll_interval: float = SEMANTIC_CACHE_INVALIDATION_POLL) -> Optional[threading.Event]:
+    """
+    Invalidate cached answers when a job completes in another process. An
+    in-process worker invalidates directly; a separate worker can't reach this
+    process's cache, so the API polls the queue for completed jobs instead.
+    Returns the stop event, or None when the cache is disabled.
+    """
+    cache = get_semantic_cache()
+    if cache is None:
+        return None
+    stop_event = threading.Event()
+    threading.Thread(
+        target=_watch_completed_jobs,
+        args=(cache, stop_event, poll_interval),
+        name="semantic-cache-invalidation",
+        daemon=True,
+    ).start()
+    return stop_event
@@ -0,0 +1,129 @@
+import random
+from typing import List, NamedTuple
+
+# Topic vocabularies give documents distinct content, so filtered and unfiltered search differ
+TOPICS = {
+    "finance": "invoice ledger budget audit expense revenue forecast payroll accrual reconciliation tax vendor",
+    "security": "access token password firewall incident breach encryption certificate audit vulnerability patch",
+    "hr": "onboarding leave benefits payroll review promotion policy contractor training handbook holiday",
+    "operations": "shipment warehouse inventory supplier logistics outage maintenance capacity schedule dispatch",
+    "engineering": "deployment pipeline service latency database cache queue release rollback migration api",
+    "legal": "contract clause liability compliance retention jurisdiction agreement warranty license dispute",
+}
+
+_SYLLABLES = "ka lo mi ne ru sa ti vo be da fe gi ho ju ly pe qua ro si tu".split()
+_FILLER = "the a of to and in for with on is are be by this that from as at".split()
+FORMATS = (".txt", ".md", ".html")
+
+
+class SyntheticDocument(NamedTuple):
+    filename: str
+    topic: str
+    content: str       # file bytes as text, in the format given by `filename`
+    sentences: List[str]
+    codes: List[str]   # identifiers such as "ERR-4021" that only exact-match search finds reliably
+
+
+class Query(NamedTuple):
+    text: str
+    doc_index: int
+    scope: str          # "document", "tag" or "all"
+
+
+def _vocabulary(rng: random.Random, size: int) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+class CorpusGenerator:
+    """
+    Deterministic synthetic documents: headed sections of paragraphs whose
+    words follow a Zipf-like distribution over a shared vocabulary, mixed with
+    the document's topic terms and a few unique codes.
+    """
+
+    def __init__(self, seed: int = 7, vocabulary_size: int = 5000):
+        self.rng = random.Random(seed)
+        self.vocabulary = _vocabulary(self.rng, vocabulary_size)
+        # Zipf weights: the word at rank r is drawn with probability ~ 1/r
+        self.weights = [1.0 / (rank + 1) for rank in range(len(self.vocabulary))]
+
+    def _sentence(self, topic_words: List[str], codes: List[str]) -> str:
+        n = self.rng.randint(8, 20)
+        words = self.rng.choices(self.vocabulary, self.weights, k=n)
+        for i in range(n):
+            roll = self.rng.random()
+            if roll < 0.25:
+                words[i] = self.rng.choice(topic_words)
+            elif roll < 0.45:
+                words[i] = self.rng.choice(_FILLER)
+        if codes and self.rng.random() < 0.1:
+            words.insert(self.rng.randrange(len(words)), self.rng.choice(codes))
+        return " ".join(words).capitalize() + "."
+
+    def document(self, index: int, words: int) -> SyntheticDocument:
+        topic = list(TOPICS)[index % len(TOPICS)]
+        topic_words = TOPICS[topic].split()
+        codes = [f"{topic[:3].upper()}-{index:04d}{k}" for k in range(3)]
+        ext = FORMATS[index % len(FORMATS)]
+
+        target = max(50, int(words * self.rng.uniform(0.7, 1.3)))
+        sections: List[List[List[str]]] = []
+        sentences: List[str] = []
+        written = 0
+        while written < target:
+            section = []
+            for _ in range(self.rng.randint(2, 5)):
+                paragraph = [self._sentence(topic_words, codes) for _ in range(self.rng.randint(3, 6))]
+                section.append(paragraph)
+                sentences.extend(paragraph)
+                written += sum(len(s.split()) for s in paragraph)
+            sections.append(section)
+
+        title = f"{topic.title()} report {index}"
+        content = _render(ext, title, sections)
+        return SyntheticDocument(f"{topic}-{index:05d}{ext}", topic, content, sentences, codes)
+
+    def documents(self, count: int, words: int) -> List[SyntheticDocument]:
+        return [self.document(i, words) for i in range(count)]
+
+    def queries(self, documents: List[SyntheticDocument], count: int, mix: dict, repeat_ratio: float) -> List[Query]:
+        """
+        Questions drawn from document sentences (and some by code), scoped per
+        `mix` ({"document": 0.6, "tag": 0.2, "all": 0.2}). A `repeat_ratio`
+        share re-asks an earlier question, as real traffic does.
+        """
+        scopes, weights = zip(*mix.items())
+        queries: List[Query] = []
+        for _ in range(count):
+            if queries and self.rng.random() < repeat_ratio:
+                queries.append(self.rng.choice(queries))
+                continue
+            doc_index = self.rng.randrange(len(documents))
+            doc = documents[doc_index]
+            if self.rng.random() < 0.2:
+                text = f"What is {self.rng.choice(doc.codes)}?"
+            else:
+                words = self.rng.choice(doc.sentences).rstrip(".").split()
+                start = self.rng.randrange(max(1, len(words) - 6))
+                text = f"What does the document say about {' '.join(words[start:start + 6]).lower()}?"
+            queries.append(Query(text, doc_index, self.rng.choices(scopes, weights)[0]))
+        return queries
+
+
+def _render(ext: str, title: str, sections: List[List[List[str]]]) -> str:
+    if ext == ".html":
+        body = "".join(
+            f"<h2>Section {i + 1}</h2>" + "".join(f"<p>{' '.join(p)}</p>" for p in section)
+            for i, section in enumerate(sections)
+        )
+        return f"<html><head><title>{title}</title></head><body><h1>{title}</h1>{body}</body></html>"
+
+    heading = "## " if ext == ".md" else ""
+    parts = [f"# {title}" if ext == ".md" else title.upper()]
+    for i, section in enumerate(sections):
+        parts.append(f"{heading}{i + 1}. Section {i + 1}" if heading else f"{i + 1}. Section {i + 1}")
+        parts.extend(" ".join(p) for p in section)
+    return "\n\n".join(parts) + "\n"
@@ -0,0 +1,86 @@
+import time
+import uuid
+import random
+import socket
+import asyncio
+import threading
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+
+def create_app(latency_ms: float, jitter_ms: float, answer_words: int, seed: int = 11) -> FastAPI:
+    """
+    Groq-compatible chat completions endpoint that sleeps for a configurable
+    latency (plus uniform jitter) and returns a canned answer, so LLM time in
+    a benchmark is controlled instead of depending on the real API.
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    answer = " ".join(["benchmark"] * answer_words)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+        prompt = body["messages"][-1]["content"]
+        prompt_tokens = len(prompt) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": answer_words,
+                "total_tokens": prompt_tokens + answer_words,
+            },
+        }
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeGroqServer:
+    """Runs the fake endpoint on a background thread; point GROQ_BASE_URL at `base_url`."""
+
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 50, answer_words: int = 60):
+        self.port = _free_port()
+        config = uvicorn.Config(
+            create_app(latency_ms, jitter_ms, answer_words),
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+            access_log=False,
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="fake-groq", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake Groq server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
@@ -0,0 +1,434 @@
+"""
+End-to-end RAG benchmark.
+
+Builds a synthetic corpus, ingests it through POST /documents/upload (and
+optionally `ingest_document`), then replays a concurrent /chat/ query mix
+against the in-process app. Qdrant is replaced by the local vector store
+and Groq by a fake server with a fixed latency, so results depend only on
+this code and the machine. Reports p50/p95/p99 per stage and per request,
+throughput and peak RSS as JSON that can be compared between commits.
+
+Run from backend/:
+
+    python -m benchmarks.rag_bench run --docs 200 --queries 1000 --concurrency 16 --output bench.json
+    python -m benchmarks.rag_bench run --output new.json --baseline bench.json   # exit 1 on regression
+    python -m benchmarks.rag_bench compare bench.json new.json --threshold 10
+
+`--embedder hash` (default) uses a feature-hashing embedder that needs no
+model download; `--embedder model` uses the configured EMBED_BACKEND for
+realistic embedding cost.
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import shutil
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import CorpusGenerator, Query, SyntheticDocument  # noqa: E402
+from benchmarks.fake_groq import FakeGroqServer  # noqa: E402
+from benchmarks.stats import StageRecorder, compare_reports, format_comparison, summarize  # noqa: E402
+
+SCOPES = ("document", "tag", "all")
+JOB_POLL_INTERVAL = 0.02
+
+
+def _parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        scope, _, weight = part.partition("=")
+        if scope not in SCOPES:
+            raise argparse.ArgumentTypeError(f"Unknown scope '{scope}' (use {', '.join(SCOPES)})")
+        mix[scope] = float(weight or 1)
+    return mix
+
+
+def _configure_environment(args, workdir: str, groq_url: str):
+    """Point every store at `workdir` and every client at local stand-ins; must run before app imports."""
+    os.environ.update({
+        "VECTOR_BACKEND": "local",
+        "LOCAL_VECTOR_DIR": os.path.join(workdir, "vector_data"),
+        "LEXICAL_INDEX_DIR": os.path.join(workdir, "lexical_index"),
+        "JOB_QUEUE_URL": f"sqlite:///{os.path.join(workdir, 'ingest_jobs.db')}",
+        "UPLOAD_SPOOL_DIR": os.path.join(workdir, "uploads"),
+        "EMBED_CACHE_PATH": os.path.join(workdir, "embedding_cache.db"),
+        "CACHE_BACKEND": "memory",
+        "INGEST_WORKER_MODE": "inprocess",
+        "INGEST_WORKER_THREADS": str(args.ingest_workers),
+        "SEMANTIC_CACHE_ENABLED": "true" if args.semantic_cache else "false",
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_BASE_URL": groq_url,
+        # The benchmark is one caller sending far more than the per-caller limits allow
+        "RATE_LIMITS": json.dumps({
+            "/chat": {"per_minute": 1e9, "burst": 1e9},
+            "/documents/upload": {"per_minute": 1e9, "burst": 1e9},
+        }),
+    })
+    if args.embedder == "hash":
+        os.environ["EMBED_BACKEND"] = "bench-hash"
+    os.makedirs(os.environ["UPLOAD_SPOOL_DIR"], exist_ok=True)
+
+
+def _register_hash_embedder():
+    from app.clients.embed_client import EmbeddingBackend, register_embed_backend
+
+    class HashingBackend(EmbeddingBackend):
+        """Signed feature hashing of lowercase words into 384 dimensions; shared words mean similar vectors."""
+
+        name = "bench-hash"
+
+        def _load(self):
+            return None
+
+        def embed(self, texts):
+            vectors = np.zeros((len(texts), 384), dtype=np.float32)
+            for row, text in zip(vectors, texts):
+                for token in re.findall(r"\w+", text.lower()):
+                    h = zlib.crc32(token.encode("utf-8"))
+                    row[h % 384] += 1.0 if (h >> 16) & 1 else -1.0
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            return vectors / norms
+
+    register_embed_backend(HashingBackend.name, HashingBackend)
+
+
+def _instrument(recorder: StageRecorder):
+    """Wrap each pipeline stage where the app looks it up, so timings come from the real code paths."""
+    from app.api.v1 import chat as chat_api
+    from app.clients.embed_client import EmbedBatcher, EmbedClient
+    from app.clients.llm_client import LLMClient
+    from app.clients.local_vector_store import LocalVectorStore
+    from app.clients.rerank_client import RerankClient
+    from app.services import index_service, ingest_service
+    from app.services.lexical_index_service import LexicalIndex
+    from worker.tasks import ingest as ingest_task
+
+    # Ingest
+    index_service.iter_text_blocks_parallel = recorder.wrap_iter("extract", index_service.iter_text_blocks_parallel)
+    index_service.iter_chunks = recorder.wrap_iter("chunk", index_service.iter_chunks)
+    ingest_service.chunk_text = recorder.wrap("chunk", ingest_service.chunk_text)
+    EmbedClient.embed = recorder.wrap("embed", EmbedClient.embed)
+    LocalVectorStore.upload_collection = recorder.wrap("upsert", LocalVectorStore.upload_collection)
+    LexicalIndex.add = recorder.wrap("lexical_index", LexicalIndex.add)
+    ingest_task.index_file = recorder.wrap("index_file", ingest_task.index_file)
+
+    # Chat
+    EmbedBatcher.embed = recorder.wrap_async("query_embed", EmbedBatcher.embed)
+    chat_api.hybrid_search = recorder.wrap_async("search", chat_api.hybrid_search)
+    RerankClient.arerank = recorder.wrap_async("rerank", RerankClient.arerank)
+    chat_api.pack_context = recorder.wrap("prompt_build", chat_api.pack_context)
+    LLMClient.agenerate = recorder.wrap_async("llm", LLMClient.agenerate)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+# ==============================
+# PHASES
+# ==============================
+async def _ingest(client, documents, args, request_samples) -> dict:
+    semaphore = asyncio.Semaphore(args.upload_concurrency)
+    document_ids = [None] * len(documents)
+    chunks = 0
+    failed = 0
+
+    async def upload(index: int, doc: SyntheticDocument):
+        nonlocal chunks, failed
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                "/documents/upload",
+                files={"file": (doc.filename, doc.content.encode("utf-8"))},
+                data={"tags": doc.topic},
+            )
+            request_samples["upload"].append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+            body = response.json()
+
+        # End-to-end: upload accepted → job completed on the in-process worker
+        while True:
+            job = (await client.get(body["status_url"])).json()
+            if job["status"] in ("completed", "failed"):
+                break
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+        request_samples["ingest"].append((time.perf_counter() - start) * 1000)
+        if job["status"] == "completed":
+            document_ids[index] = body["document_id"]
+            chunks += job["chunks_stored"]
+        else:
+            failed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(i, doc) for i, doc in enumerate(documents)))
+    elapsed = time.perf_counter() - start
+    corpus_mb = sum(len(d.content.encode("utf-8")) for d in documents) / (1024 * 1024)
+    return {
+        "document_ids": document_ids,
+        "chunks": chunks,
+        "failed": failed,
+        "seconds": elapsed,
+        "docs_per_s": len(documents) / elapsed,
+        "chunks_per_s": chunks / elapsed,
+        "mb_per_s": corpus_mb / elapsed,
+    }
+
+
+def _service_ingest(documents, request_samples):
+    """Time the synchronous `ingest_document` path (plain text in, no extraction)."""
+    from app.db.session import SessionLocal, engine
+    from app.models.document import Document
+    from app.services.ingest_service import ingest_document
+
+    Document.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        for doc in documents:
+            start = time.perf_counter()
+            ingest_document(db, doc.filename, "\n\n".join(doc.sentences))
+            request_samples["service_ingest"].append((time.perf_counter() - start) * 1000)
+    finally:
+        db.close()
+
+
+def _chat_payload(query: Query, documents, document_ids) -> dict:
+    if query.scope == "document" and document_ids[query.doc_index]:
+        return {"query": query.text, "document_id": document_ids[query.doc_index]}
+    if query.scope == "tag":
+        return {"query": query.text, "tags": [documents[query.doc_index].topic]}
+    return {"query": query.text, "scope": "all"}
+
+
+async def _chat(client, queries, documents, document_ids, concurrency, request_samples) -> dict:
+    pending = list(queries)
+    outcomes = {"answered": 0, "short_circuit": 0, "errors": 0}
+
+    async def worker():
+        while pending:
+            query = pending.pop()
+            start = time.perf_counter()
+            response = await client.post("/chat/", json=_chat_payload(query, documents, document_ids))
+            request_samples["chat"].append((time.perf_counter() - start) * 1000)
+            body = response.json() if response.status_code == 200 else {}
+            if response.status_code != 200 or body.get("answer", "").startswith("Error processing query"):
+                outcomes["errors"] += 1
+            elif "prompt_tokens" in body:
+                outcomes["answered"] += 1
+            else:
+                # Semantic cache hit or no retrievable context: answered without the LLM
+                outcomes["short_circuit"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "qps": len(queries) / elapsed, **outcomes}
+
+
+async def _run_phases(args, documents, recorder) -> dict:
+    import httpx
+    from app.main import app
+
+    request_samples = {"upload": [], "ingest": [], "service_ingest": [], "chat": []}
+    generator = CorpusGenerator(seed=args.seed + 1)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            recorder.reset()
+            ingest = await _ingest(client, documents, args, request_samples)
+            if args.service_docs:
+                await asyncio.to_thread(_service_ingest, documents[:args.service_docs], request_samples)
+            ingest_stages = {f"ingest.{k}": summarize(v) for k, v in recorder.samples.items()}
+            ingest_rss = _peak_rss_mb()
+
+            queries = generator.queries(documents, args.queries, args.mix, args.repeat_ratio)
+            warmup = generator.queries(documents, args.warmup, args.mix, 0.0)
+            await _chat(client, warmup, documents, ingest["document_ids"], args.concurrency, {"chat": []})
+
+            recorder.reset()
+            chat = await _chat(client, queries, documents, ingest["document_ids"], args.concurrency, request_samples)
+            chat_stages = {f"chat.{k}": summarize(v) for k, v in recorder.samples.items()}
+
+    return {
+        "stages": {**ingest_stages, **chat_stages},
+        "requests": {name: summarize(samples) for name, samples in request_samples.items() if samples},
+        "throughput": {
+            "ingest_docs_per_s": round(ingest["docs_per_s"], 3),
+            "ingest_chunks_per_s": round(ingest["chunks_per_s"], 3),
+            "ingest_mb_per_s": round(ingest["mb_per_s"], 3),
+            "chat_qps": round(chat["qps"], 3),
+        },
+        "counts": {
+            "documents": len(documents),
+            "documents_failed": ingest["failed"],
+            "chunks": ingest["chunks"],
+            "queries": len(queries),
+            "chat_answered": chat["answered"],
+            "chat_short_circuit": chat["short_circuit"],
+            "chat_errors": chat["errors"],
+        },
+        "peak_rss_mb_after_ingest": ingest_rss,
+    }
+
+
+# ==============================
+# COMMANDS
+# ==============================
+def run(args) -> int:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    # Relative paths the app resolves itself (./enterprise.db) also land in the workdir
+    os.chdir(workdir)
+
+    random.seed(args.seed)
+    documents = CorpusGenerator(seed=args.seed).documents(args.docs, args.doc_words)
+
+    recorder = StageRecorder()
+    try:
+        with FakeGroqServer(args.llm_latency_ms, args.llm_jitter_ms) as groq:
+            _configure_environment(args, workdir, groq.base_url)
+            if args.embedder == "hash":
+                _register_hash_embedder()
+            _instrument(recorder)
+            results = asyncio.run(_run_phases(args, documents, recorder))
+    finally:
+        os.chdir(BACKEND_DIR)
+        if not args.workdir and not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("command", "func", "output", "baseline", "threshold", "workdir", "keep_workdir")
+        },
+        **results,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.output}")
+    else:
+        print(text)
+    _print_summary(report)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return _report_comparison(baseline, report, args.threshold)
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return _report_comparison(baseline, current, args.threshold)
+
+
+def _report_comparison(baseline: dict, current: dict, threshold: float) -> int:
+    if baseline.get("config") != current.get("config"):
+        print("warning: benchmark configs differ; comparison may not be meaningful", file=sys.stderr)
+    rows, regressions = compare_reports(baseline, current, threshold)
+    print(format_comparison(rows))
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {threshold}%: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo regressions beyond {threshold}%")
+    return 0
+
+
+def _print_summary(report: dict):
+    print(f"\n{'stage':<28} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}", file=sys.stderr)
+    for section in ("stages", "requests"):
+        for name, s in report[section].items():
+            if s.get("count"):
+                print(
+                    f"{section[0]}:{name:<26} {s['count']:>7} {s['p50_ms']:>10.2f} {s['p95_ms']:>10.2f} {s['p99_ms']:>10.2f}",
+                    file=sys.stderr,
+                )
+    t = report["throughput"]
+    print(
+        f"\ningest {t['ingest_docs_per_s']:.1f} docs/s, {t['ingest_chunks_per_s']:.1f} chunks/s; "
+        f"chat {t['chat_qps']:.1f} qps; peak RSS {report['peak_rss_mb']} MB; counts {report['counts']}",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("run", help="run the benchmark")
+    p.add_argument("--docs", type=int, default=100, help="documents in the synthetic corpus")
+    p.add_argument("--doc-words", type=int, default=2000, help="mean words per document")
+    p.add_argument("--queries", type=int, default=500, help="measured chat requests")
+    p.add_argument("--warmup", type=int, default=20, help="unmeasured chat requests before the run")
+    p.add_argument("--concurrency", type=int, default=8, help="concurrent chat clients")
+    p.add_argument("--upload-concurrency", type=int, default=4, help="concurrent uploads")
+    p.add_argument("--ingest-workers", type=int, default=1, help="in-process ingest worker threads")
+    p.add_argument("--service-docs", type=int, default=5, help="documents also timed through ingest_document")
+    p.add_argument("--mix", type=_parse_mix, default=_parse_mix("document=0.6,tag=0.2,all=0.2"),
+                   help="chat scope weights, e.g. document=0.6,tag=0.2,all=0.2")
+    p.add_argument("--repeat-ratio", type=float, default=0.1, help="share of queries repeating an earlier one")
+    p.add_argument("--semantic-cache", action="store_true", help="leave the semantic answer cache on")
+    p.add_argument("--embedder", choices=("hash", "model"), default="hash")
+    p.add_argument("--llm-latency-ms", type=float, default=300)
+    p.add_argument("--llm-jitter-ms", type=float, default=50)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--workdir", help="directory for stores (default: a temporary directory, removed afterwards)")
+    p.add_argument("--keep-workdir", action="store_true")
+    p.add_argument("--output", help="write the JSON report here instead of stdout")
+    p.add_argument("--baseline", help="compare against this report and exit 1 on regressions")
+    p.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    p.set_defaults(func=run)
+
+    c = commands.add_parser("compare", help="compare two reports")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    c.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
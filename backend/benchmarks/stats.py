@@ -0,0 +1,152 @@
+import time
+import functools
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# Latency changes smaller than this are noise regardless of percentage
+NOISE_FLOOR_MS = 1.0
+
+
+class StageRecorder:
+    """
+    Collects latency samples per stage. Synchronous spans are exclusive: time
+    spent in a nested span (extraction pulled through the chunker, say) is
+    subtracted from the outer one, so stages add up instead of double counting.
+    Async spans record wall time and don't nest.
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds * 1000)
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+
+    @contextmanager
+    def _exclusive(self, total: List[float]):
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            child = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            total[0] += elapsed - child
+
+    @contextmanager
+    def span(self, stage: str):
+        total = [0.0]
+        with self._exclusive(total):
+            yield
+        self.record(stage, total[0])
+
+    def wrap(self, stage: str, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def wrap_async(self, stage: str, fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def wrap_iter(self, stage: str, fn):
+        """Wrap a generator function; one sample per exhausted (or closed) generator."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return self._timed_iter(stage, fn(*args, **kwargs))
+        return wrapper
+
+    def _timed_iter(self, stage: str, iterable: Iterable) -> Iterator:
+        it = iter(iterable)
+        total = [0.0]
+        try:
+            while True:
+                with self._exclusive(total):
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                yield item
+        finally:
+            self.record(stage, total[0])
+
+
+def summarize(samples_ms: List[float]) -> dict:
+    if not samples_ms:
+        return {"count": 0}
+    values = np.asarray(samples_ms)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3),
+        "total_ms": round(float(values.sum()), 3),
+    }
+
+
+# ==============================
+# COMPARISON
+# ==============================
+def _flatten(report: dict) -> Dict[str, Tuple[float, bool]]:
+    """metric name → (value, higher_is_better) for every comparable number in a report."""
+    metrics = {}
+    for section in ("stages", "requests"):
+        for name, summary in report.get(section, {}).items():
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                if key in summary:
+                    metrics[f"{section}.{name}.{key}"] = (summary[key], False)
+    for name, value in report.get("throughput", {}).items():
+        metrics[f"throughput.{name}"] = (value, True)
+    if "peak_rss_mb" in report:
+        metrics["peak_rss_mb"] = (report["peak_rss_mb"], False)
+    return metrics
+
+
+def compare_reports(baseline: dict, current: dict, threshold_pct: float) -> Tuple[List[dict], List[str]]:
+    """Per-metric deltas and the names of metrics that regressed by more than `threshold_pct`."""
+    base, cur = _flatten(baseline), _flatten(current)
+    rows, regressions = [], []
+    for name in sorted(base.keys() & cur.keys()):
+        (old, higher_is_better), (new, _) = base[name], cur[name]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better else change
+        regressed = worse > threshold_pct and (higher_is_better or name == "peak_rss_mb" or new - old > NOISE_FLOOR_MS)
+        rows.append({"metric": name, "baseline": old, "current": new, "change_pct": round(change, 1), "regressed": regressed})
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def format_comparison(rows: List[dict]) -> str:
+    width = max([len(r["metric"]) for r in rows] + [6])
+    lines = [f"{'metric':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}"]
+    for r in rows:
+        flag = "  REGRESSED" if r["regressed"] else ""
+        lines.append(
+            f"{r['metric']:<{width}}  {r['baseline']:>12.3f}  {r['current']:>12.3f}  {r['change_pct']:>+7.1f}%{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,139 @@
+import time
+
+import fakeredis
+import pytest
+
+from app.services.cache_service import CacheService, MemoryCacheBackend, RedisCacheBackend
+
+
+# ==============================
+# IN-MEMORY BACKEND
+# ==============================
+@pytest.fixture
+def memory():
+    # One shard so the whole capacity is a single LRU; sweeping is driven by the tests
+    backend = MemoryCacheBackend(max_entries=3, shards=1, sweep_interval=0)
+    yield backend
+    backend.close()
+
+
+def test_memory_set_get_and_ttl_expiry(memory):
+    memory.set("answer", {"text": "hello"}, ttl=60)
+    memory.set("short", "value", ttl=1)
+    assert memory.get("answer") == {"text": "hello"}
+    assert memory.get("short") == "value"
+
+    time.sleep(1.1)
+    assert memory.get("short") is None
+    assert memory.get("answer") == {"text": "hello"}
+
+
+def test_memory_evicts_least_recently_used(memory):
+    for key in ("a", "b", "c"):
+        memory.set(key, key, ttl=60)
+    # Reading "a" makes "b" the least recently used
+    assert memory.get("a") == "a"
+    memory.set("d", "d", ttl=60)
+
+    assert memory.get("b") is None
+    assert [memory.get(k) for k in ("a", "c", "d")] == ["a", "c", "d"]
+    assert len(memory) == 3
+
+
+def test_memory_sweep_drops_expired_entries_and_ended_windows(memory):
+    memory.set("short", 1, ttl=1)
+    memory.set("long", 1, ttl=60)
+    memory.incr_window("calls", window=1)
+
+    time.sleep(1.1)
+    assert memory.sweep() == 2
+    assert len(memory) == 1
+
+
+def test_memory_background_sweeper():
+    backend = MemoryCacheBackend(max_entries=10, shards=2, sweep_interval=0.2)
+    try:
+        backend.set("short", 1, ttl=0)
+        time.sleep(0.5)
+        assert len(backend) == 0
+    finally:
+        backend.close()
+
+
+def test_memory_incr_window_counts_then_resets(memory):
+    assert [memory.incr_window("calls", window=1) for _ in range(3)] == [1, 2, 3]
+
+    time.sleep(1.1)
+    assert memory.incr_window("calls", window=1) == 1
+
+
+def test_memory_counters_survive_eviction_pressure(memory):
+    cache = CacheService(backend=memory)
+    assert [cache.is_rate_limited("user:1", limit=2, window=60) for _ in range(2)] == [False, False]
+
+    # Far more cache writes than the LRU holds must not reset the caller's window
+    for i in range(100):
+        memory.set(f"answer:{i}", i, ttl=60)
+
+    assert cache.is_rate_limited("user:1", limit=2, window=60) is True
+    cache.reset("user:1")
+    assert cache.is_rate_limited("user:1", limit=2, window=60) is False
+
+
+# ==============================
+# REDIS BACKEND
+# ==============================
+@pytest.fixture
+def backend():
+    backend = RedisCacheBackend(client=fakeredis.FakeRedis())
+    yield backend
+    backend.close()
+
+
+def test_set_get_round_trips_json(backend):
+    backend.set("answer", {"text": "hello", "sources": [1, 2]}, ttl=60)
+    assert backend.get("answer") == {"text": "hello", "sources": [1, 2]}
+    assert backend.get("missing") is None
+
+
+def test_set_applies_ttl(backend):
+    backend.set("short", "value", ttl=1)
+    assert 0 < backend.client.ttl("short") <= 1
+
+    time.sleep(1.1)
+    assert backend.get("short") is None
+
+
+def test_delete(backend):
+    backend.set("key", 1, ttl=60)
+    backend.delete("key")
+    assert backend.get("key") is None
+
+
+def test_incr_window_counts_then_resets(backend):
+    assert [backend.incr_window("calls", window=1) for _ in range(3)] == [1, 2, 3]
+    # Later hits must not push the window's expiry back
+    assert 0 < backend.client.ttl("calls") <= 1
+
+    time.sleep(1.1)
+    assert backend.incr_window("calls", window=1) == 1
+
+
+def test_rate_limiting_through_cache_service(backend):
+    cache = CacheService(backend=backend)
+    assert [cache.is_rate_limited("user:1", limit=2, window=60) for _ in range(3)] == [False, False, True]
+    assert cache.is_rate_limited("user:2", limit=2, window=60) is False
+
+    cache.reset("user:1")
+    assert cache.is_rate_limited("user:1", limit=2, window=60) is False
+
+
+def test_redis_errors_degrade_to_misses():
+    server = fakeredis.FakeServer()
+    server.connected = False
+    backend = RedisCacheBackend(client=fakeredis.FakeRedis(server=server))
+
+    backend.set("key", 1, ttl=60)
+    assert backend.get("key") is None
+    assert backend.incr_window("calls", window=60) == 0
+    backend.delete("key")
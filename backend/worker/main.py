@@ -0,0 +1,99 @@
+import os
+import signal
+import logging
+import threading
+
+from app.clients.registry import VECTOR_BACKEND
+from app.core.metrics import start_metrics_server
+from app.services import job_service
+from app.services.extract_service import shutdown_extract_pool
+from worker.tasks.embed import warmup_embedder
+from worker.tasks.ingest import run_ingest_job, run_reindex_job
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+
+# Well inside the lease, so a slow extraction or embedding step never looks like a dead worker
+HEARTBEAT_INTERVAL = job_service.JOB_LEASE_SECONDS / 5
+
+TASKS = {
+    "ingest": run_ingest_job,
+    "reindex": run_reindex_job,
+}
+
+
+def run_worker(stop_event: threading.Event, poll_interval: float = POLL_INTERVAL) -> None:
+    """Claim and run queued jobs until `stop_event` is set."""
+    while not stop_event.is_set():
+        try:
+            job = job_service.claim_next_job()
+        except Exception:
+            logger.exception("Failed to claim job")
+            stop_event.wait(poll_interval)
+            continue
+
+        if job is None:
+            job_service.wait_for_jobs(poll_interval)
+            continue
+
+        task = TASKS.get(job.kind)
+        if task is None:
+            job_service.fail_job(job.id, f"Unknown job kind: {job.kind}")
+            continue
+
+        _run_with_heartbeat(task, job)
+
+
+def _run_with_heartbeat(task, job) -> None:
+    done = threading.Event()
+
+    def beat():
+        while not done.wait(HEARTBEAT_INTERVAL):
+            try:
+                job_service.heartbeat(job.id)
+            except Exception:
+                logger.exception(f"Heartbeat for job {job.id} failed")
+
+    threading.Thread(target=beat, name=f"heartbeat-{job.id[:8]}", daemon=True).start()
+    try:
+        task(job)
+    finally:
+        done.set()
+
+
+def start_worker_threads(count: int = 1) -> threading.Event:
+    """Run the worker loop on daemon threads inside the current process (API fallback mode)."""
+    stop_event = threading.Event()
+    for i in range(count):
+        threading.Thread(
+            target=run_worker,
+            args=(stop_event,),
+            name=f"ingest-worker-{i}",
+            daemon=True,
+        ).start()
+    return stop_event
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    if VECTOR_BACKEND == "local":
+        # The API owns the local store; writing it from this process would collide with its slot state
+        raise SystemExit("VECTOR_BACKEND=local is single-process: run the worker in-process (INGEST_WORKER_MODE=inprocess)")
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    warmup_embedder()
+    # The worker has no HTTP server of its own; expose its ingest metrics when WORKER_METRICS_PORT is set
+    start_metrics_server()
+    logger.info("Worker started, waiting for jobs...")
+    run_worker(stop_event)
+    shutdown_extract_pool()
+    logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import logging
+
+from app.clients.registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+
+def warmup_embedder() -> None:
+    """Load the embedding model before the first job is claimed."""
+    logger.info("Pre-loading embedding model in worker...")
+    get_registry().embed_client.warmup()
+    logger.info("Embedding model pre-loaded")
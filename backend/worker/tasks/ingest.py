@@ -0,0 +1,54 @@
+import os
+import logging
+
+from app.clients.registry import get_registry
+from app.services import job_service
+from app.services.extract_service import ExtractionError
+from app.services.index_service import index_file
+from app.services.semantic_cache_service import get_semantic_cache
+
+logger = logging.getLogger(__name__)
+
+
+def run_ingest_job(job, reindex: bool = False) -> None:
+    """Extract, embed and index a spooled upload, recording progress on the job."""
+    logger.info(f"Ingest job {job.id} ({job.kind}) started for '{job.filename}'")
+
+    try:
+        result = index_file(
+            job.file_path,
+            job.filename,
+            job.document_id,
+            get_registry().vector_store(job.collection_name),
+            on_progress=lambda n: job_service.update_job(job.id, chunks_stored=n),
+            reindex=reindex,
+            tags=job_service.job_tags(job),
+            tenant_id=job.tenant_id,
+        )
+        job_service.complete_job(job.id, result.chunks)
+
+        # Only reaches the API's cache when the worker runs in-process; otherwise the API's
+        # invalidation watcher picks the completed job up from the queue
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None:
+            semantic_cache.invalidate(job.document_id)
+        logger.info(
+            f"Ingest job {job.id} completed ({result.chunks} chunks, "
+            f"{result.upserted} upserted, {result.deleted} deleted)"
+        )
+
+    except ExtractionError as e:
+        job_service.fail_job(job.id, str(e))
+
+    except Exception as e:
+        logger.exception(f"Ingest job {job.id} failed")
+        job_service.fail_job(job.id, f"Ingestion failed: {e}")
+
+    finally:
+        if os.path.exists(job.file_path):
+            os.unlink(job.file_path)
+
+
+def run_reindex_job(job) -> None:
+    """Diff a new version of a document against its stored chunks."""
+    run_ingest_job(job, reindex=True)
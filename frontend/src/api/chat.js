@@ -39,3 +39,66 @@ export async function askAI(question) {
   const data = await response.json();
   return data; // { answer: "..." }
 }
+
+/**
+ * Stream an answer from the AI backend as it is generated (server-sent events)
+ * @param {string} question - The user's question
+ * @param {Object} handlers - { onSources(sources), onToken(text) }
+ * @returns {Promise<string>} - The full answer once the stream completes
+ */
+export async function askAIStream(question, { onSources, onToken } = {}) {
+  if (!question || question.trim() === "") {
+    throw new Error("Please enter a question");
+  }
+
+  const documentId = localStorage.getItem("latest_document_id");
+
+  if (!documentId) {
+    throw new Error("No document uploaded yet. Please upload a document first.");
+  }
+
+  const response = await fetch(`${API_BASE}/chat/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      query: question.trim(),
+      document_id: documentId,
+    }),
+  });
+
+  if (!response.ok || !response.body) {
+    const text = await response.text();
+    throw new Error(text || "Failed to get AI response. Please try again.");
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let answer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    const events = buffer.split("\n\n");
+    buffer = events.pop();
+
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+
+      if (event === "sources") onSources?.(data.sources);
+      if (event === "token") {
+        answer += data.text;
+        onToken?.(data.text);
+      }
+      if (event === "error") throw new Error(data.message);
+    }
+  }
+
+  return answer;
+}
@@ -41,4 +41,41 @@ export async function uploadDocument(file) {
     }
     throw error;
   }
-}
\ No newline at end of file
+}
+
+/**
+ * Get the indexing status of an uploaded document
+ * @param {string} jobId - The job_id returned by uploadDocument
+ * @returns {Promise<Object>} - { status, stage, chunks_stored, error, ... }
+ */
+export async function getUploadJob(jobId) {
+  const response = await fetch(`${API_BASE}/documents/jobs/${jobId}`);
+
+  if (!response.ok) {
+    const text = await response.text();
+    throw new Error(text || "Failed to get upload status.");
+  }
+
+  return response.json();
+}
+
+/**
+ * Poll an upload's indexing job until it completes or fails
+ * @param {string} jobId - The job_id returned by uploadDocument
+ * @param {Function} onProgress - Called with each job status while it is queued or running
+ * @returns {Promise<Object>} - The final job: status "completed" or "failed"
+ */
+export async function waitForUploadJob(jobId, onProgress, intervalMs = 1500, timeoutMs = 600000) {
+  const deadline = Date.now() + timeoutMs;
+
+  while (Date.now() < deadline) {
+    const job = await getUploadJob(jobId);
+    if (job.status === "completed" || job.status === "failed") {
+      return job;
+    }
+    onProgress?.(job);
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+
+  throw new Error("Indexing is taking longer than expected. Check back later.");
+}
@@ -1,5 +1,5 @@
 import { useState } from "react";
-import { uploadDocument } from "../api/documents";
+import { uploadDocument, waitForUploadJob } from "../api/documents";
 
 export default function UploadBox() {
   const [file, setFile] = useState(null);
@@ -29,20 +29,35 @@ export default function UploadBox() {
     }
 
     setIsUploading(true);
-    setStatus("⏳ Uploading and processing document...");
+    setStatus("⏳ Uploading document...");
 
     try {
-      // 🔥 CAPTURE RESPONSE
+      // 🔥 CAPTURE RESPONSE (202: queued for indexing, not indexed yet)
       const res = await uploadDocument(file);
+      setFile(null);
+      document.querySelector('input[type="file"]').value = "";
 
-      // 🔥 STORE document_id (CRITICAL)
+      // 🔥 POLL THE JOB UNTIL INDEXING FINISHES
+      setStatus("⏳ Uploaded, waiting to be indexed...");
+      const job = await waitForUploadJob(res.job_id, (progress) => {
+        setStatus(
+          progress.status === "running"
+            ? `⏳ Indexing... ${progress.chunks_stored} chunks stored`
+            : "⏳ Uploaded, waiting to be indexed..."
+        );
+      });
+
+      if (job.status === "failed") {
+        setStatus(`❌ Indexing failed: ${job.error || "Unknown error"}`);
+        return;
+      }
+
+      // 🔥 STORE document_id (CRITICAL) once it is searchable
       if (res?.document_id) {
         localStorage.setItem("latest_document_id", res.document_id);
       }
 
-      setStatus("✅ Document uploaded and indexed successfully!");
-      setFile(null);
-      document.querySelector('input[type="file"]').value = "";
+      setStatus(`✅ Document indexed successfully (${job.chunks_stored} chunks)!`);
     } catch (err) {
       console.error("Upload error:", err);
       setStatus(`❌ Upload failed: ${err.message || "Unknown error"}`);